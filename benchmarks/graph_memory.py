@@ -0,0 +1,72 @@
+"""Bytes per node and per edge of graph.py boards, against the previous layout
+(plain nodes with a __dict__, a signed weight list on each end of every edge).
+
+    python benchmarks/graph_memory.py [nodes] [edges per node]
+"""
+from __future__ import annotations
+from pathlib import Path
+
+import gc
+import sys
+import tracemalloc
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "game"))
+
+from graph import Graph, MultiGraph, UndirectedGraph, WeightedGraph
+
+
+class PlainNode:
+    def __init__(self, value) -> None:
+        self.value = value
+
+
+def measure(build, *args) -> int:
+    """Bytes still allocated by the object build(*args) returns"""
+    gc.collect()
+    tracemalloc.start()
+    result = build(*args)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def previous_graph(node_count: int, degree: int) -> dict:
+    graph = {PlainNode(i): {} for i in range(node_count)}
+    nodes = list(graph)
+    for i, node in enumerate(nodes):
+        for step in range(1, degree + 1):
+            other = nodes[(i + step) % node_count]
+            graph[node][other] = [1]
+            graph[other][node] = [-1]
+
+    return graph
+
+
+def current_graph(cls: type, node_count: int, degree: int):
+    graph = cls()
+    nodes = graph.add_nodes_from(range(node_count))
+    pairs = ((node, nodes[(i + step) % node_count]) for i, node in enumerate(nodes) for step in range(1, degree + 1))
+    graph.add_edges_from((node1, node2, 1) for node1, node2 in pairs) if graph.weighted else graph.add_edges_from(pairs)
+
+    return graph
+
+
+def main(node_count: int = 100_000, degree: int = 4) -> None:
+    edge_count = node_count * degree
+    print(f"{node_count} nodes, {edge_count} edges")
+    print(f"{'layout':<20}{'node object':>12}{'bytes/node':>12}{'bytes/edge':>12}")
+
+    rows = [("previous", measure(lambda: [PlainNode(i) for i in range(node_count)]),
+             measure(previous_graph, node_count, 0), measure(previous_graph, node_count, degree))]
+    for cls in (Graph, WeightedGraph, UndirectedGraph, MultiGraph):
+        rows.append((cls.__name__, measure(lambda: [cls.Node(i) for i in range(node_count)]),
+                     measure(current_graph, cls, node_count, 0), measure(current_graph, cls, node_count, degree)))
+
+    # bytes/node includes the node's (empty) adjacency dicts, bytes/edge everything added by the edges
+    for name, objects, nodes, total in rows:
+        print(f"{name:<20}{objects / node_count:>12.1f}{nodes / node_count:>12.1f}{(total - nodes) / edge_count:>12.1f}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
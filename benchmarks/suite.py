@@ -0,0 +1,430 @@
+"""Benchmark suite: graph operations, card operations and whole bot-only games.
+
+Every benchmark is timed best of --repeat runs, then run once more under tracemalloc for its peak
+memory. Results are saved as JSON (default: benchmarks/results/<commit>.json) to compare commits
+on the same machine.
+
+    python benchmarks/suite.py [--quick] [--filter graph] [--sizes 1000 1000000] [--output file]
+    python benchmarks/suite.py --compare benchmarks/results/<old>.json
+"""
+from __future__ import annotations
+from collections.abc import Callable
+from pathlib import Path
+
+import argparse
+import asyncio
+import datetime
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "game"))
+
+from boards import jump_board, square_grid
+from game import DECK_52, BoardGame, CardGame, ChaoticBot, FrenchCard, Hand, Suit, TurnBasedGame
+from graph import Graph
+
+RESULTS = Path(__file__).resolve().parent / "results"
+GRAPH_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+# name: factory(size) -> (run, operations per run). The factory does the setup, only run() is timed.
+BENCHMARKS: dict[str, tuple[Callable, bool]] = {}
+
+
+def benchmark(name: str, sized: bool = False):
+    def register(factory: Callable) -> Callable:
+        BENCHMARKS[name] = (factory, sized)
+        return factory
+    return register
+
+
+# graph.py
+
+def grid_side(size: int) -> int:
+    return max(2, round(size ** 0.5))
+
+
+@benchmark("graph.build_grid", sized=True)
+def graph_build_grid(size: int):
+    side = grid_side(size)
+    return lambda: square_grid(side, side), side * side
+
+
+@benchmark("graph.add_edge", sized=True)
+def graph_add_edge(size: int):
+    def run():
+        graph = Graph()
+        nodes = [graph.add_node(i) for i in range(size)]
+        for i in range(size):
+            graph.add_edge(nodes[i], nodes[(i + 1) % size])
+            graph.add_edge(nodes[i], nodes[(i * 7 + 3) % size])
+    return run, 2 * size
+
+
+@benchmark("graph.bfs", sized=True)
+def graph_bfs(size: int):
+    side = grid_side(size)
+    graph = square_grid(side, side)
+    start = next(iter(graph.nodes))
+    return lambda: sum(1 for _ in graph.iter_bfs(start)), side * side
+
+
+@benchmark("graph.dfs", sized=True)
+def graph_dfs(size: int):
+    side = grid_side(size)
+    graph = square_grid(side, side)
+    start = next(iter(graph.nodes))
+    return lambda: sum(1 for _ in graph.iter_dfs(start)), side * side
+
+
+@benchmark("graph.frozen_bfs", sized=True)
+def graph_frozen_bfs(size: int):
+    side = grid_side(size)
+    frozen = square_grid(side, side).freeze()
+    start = next(iter(frozen))
+    return lambda: sum(1 for _ in frozen.iter_bfs(start)), side * side
+
+
+@benchmark("graph.frozen_bfs_indices", sized=True)
+def graph_frozen_bfs_indices(size: int):
+    side = grid_side(size)
+    frozen = square_grid(side, side).freeze()
+    return lambda: sum(1 for _ in frozen.iter_bfs_indices(0)), side * side
+
+
+@benchmark("graph.edge_queries", sized=True)
+def graph_edge_queries(size: int):
+    side = grid_side(size)
+    graph = square_grid(side, side)
+    nodes = list(graph.nodes)
+    rng = random.Random(0)
+    pairs = [(rng.choice(nodes), rng.choice(nodes)) for _ in range(10_000)]
+
+    def run():
+        for node1, node2 in pairs:
+            graph.find_edge(node1, node2, 1)
+            len(graph.get_out_edges(node1))
+    return run, len(pairs)
+
+
+# cards
+
+@benchmark("cards.build_decks")
+def cards_build_decks():
+    def run():
+        for _ in range(1_000):
+            deck = [FrenchCard(f"{rank} of {suit.name}", rank, suit) for suit in Suit for rank in range(1, 14)]
+            Hand(deck)
+    return run, 1_000
+
+
+@benchmark("cards.shuffle_and_draw")
+def cards_shuffle_and_draw():
+    game = Shedding()
+    players = [game.add_player(SheddingBot(f"Seat {i}", game)) for i in range(4)]
+    random.seed(0)
+
+    def run():
+        for _ in range(1_000):
+            pile = list(DECK_52)
+            random.shuffle(pile)
+            for player in players:
+                player._hand = Hand()
+                player.draw(pile)
+    return run, 1_000
+
+
+@benchmark("cards.deal_numpy")
+def cards_deal_numpy():
+    try:
+        import dealing
+    except ImportError:
+        return None, 0
+
+    game = Shedding()
+    for i in range(4):
+        game.add_player(SheddingBot(f"Seat {i}", game))
+
+    def run():
+        hands, stock = dealing.deal(DECK_52, 1_000, 4, 13, 0)
+        for masks, pile in zip(dealing.hand_masks(hands), stock):
+            game.deal_hands(masks, pile)
+    return run, 1_000
+
+
+@benchmark("cards.hand_ops")
+def cards_hand_ops():
+    rng = random.Random(0)
+    hands = [Hand(rng.sample(DECK_52, 13)) for _ in range(1_000)]
+    others = [Hand(rng.sample(DECK_52, 13)) for _ in range(1_000)]
+
+    def run():
+        for hand, other in zip(hands, others):
+            for card in DECK_52[:13]:
+                card in hand
+            for suit in Suit:
+                hand.count_suit(suit)
+            len(hand | other), len(hand & other), len(hand - other)
+            for card in list(hand)[:3]:
+                hand.remove(card)
+                hand.add(card)
+    return run, len(hands)
+
+
+# whole games between ChaoticBot seats
+
+decisions = 0
+
+
+class CountingBot(ChaoticBot):
+    def decide(self, options):
+        global decisions
+        decisions += 1
+        return super().decide(options)
+
+
+JUMPS = {3: 21, 8: 30, 28: 84, 58: 77, 75: 86, 80: 99, 16: 6, 47: 25, 49: 11, 62: 19, 87: 24, 93: 73, 95: 75, 98: 78}
+
+
+class SnakesAndLadders(BoardGame):
+    class Player(BoardGame.Player):
+        def __init__(self, name: str, game: SnakesAndLadders) -> None:
+            super().__init__(name, game)
+            self.square = game.start
+            self.add_choice("Roll", lambda self: True, SnakesAndLadders.Player.roll, depends=())
+            self.add_choice("Wait", lambda self: self.square.value % 10 == 5, lambda self: None, depends=("square",))
+
+
+        def roll(self) -> None:
+            """Moves along one of the square's edges, each edge being one face of the die"""
+            face = self.game.rng.randint(1, 6)
+            for square, faces in self.game.board.get_out_edges(self.square).items():
+                face -= len(faces)
+                if face <= 0:
+                    self.square = square
+                    self.invalidate("square")
+                    return
+
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.board = jump_board(100, JUMPS)
+        self.start = self.board.find_node(0)
+        self.finish = self.board.find_node(99)
+        self.turn_phases = [TurnBasedGame.TurnPhase.PLAY]
+
+
+    @property
+    def is_game_over(self) -> bool:
+        for player in self.players:
+            if player.square is self.finish:
+                self.winners = [player]
+                self.losers = [other for other in self.players if other is not player]
+                return True
+        return False
+
+
+    def setup(self) -> None:
+        super().setup()
+
+
+    def loop(self) -> None:
+        super().loop()
+
+
+class SnakesAndLaddersBot(CountingBot, SnakesAndLadders.Player): pass
+
+
+class Shedding(CardGame):
+    """Play a card of the top card's suit or rank, or draw. The first player without cards wins."""
+    class Player(CardGame.Player):
+        def __init__(self, name: str, game: Shedding) -> None:
+            super().__init__(name, game)
+            for name in list(self.choices):
+                self.remove_choice(name)
+            self.add_choice("Play", Shedding.Player.can_play, Shedding.Player.play_match, depends=("hand", "pile"))
+            self.add_choice("Draw", lambda self: bool(self.game.stock), Shedding.Player.draw_stock, depends=("stock",))
+
+
+        def matches(self) -> Hand:
+            top = self.game.pile[-1]
+            return self._hand.suit(top.suit) | self._hand.rank(top.rank)
+
+
+        def can_play(self) -> bool:
+            return bool(self.matches())
+
+
+        def draw_stock(self) -> None:
+            self.draw_card(self.game.stock)
+            self.game.invalidate("stock")
+
+
+        def play_match(self) -> None:
+            card = min(self.matches())
+            self.play_card(card)
+            self.game.pile.append(card)
+            self.game.invalidate("pile")
+
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.turn_phases = [CardGame.TurnPhase.PLAY]
+        self.hand_limit = 7
+        self.pile = []
+
+
+    @property
+    def is_game_over(self) -> bool:
+        for player in self.players:
+            if not player.hand_size():
+                self.winners = [player]
+                self.losers = [other for other in self.players if other is not player]
+                return True
+        return False
+
+
+    def setup(self) -> None:
+        super().setup()
+        self.stock = list(self.deck)
+        self.rng.shuffle(self.stock)
+        for player in self.players:
+            player.draw(self.stock)
+        self.pile = [self.stock.pop()]
+        self.invalidate("stock", "pile")
+
+
+    def loop(self) -> None:
+        super().loop()
+
+
+class SheddingBot(CountingBot, Shedding.Player): pass
+
+
+def game_throughput(game: type, bot: type, games: int = 1_000, seats: int = 4):
+    def run():
+        global decisions
+        decisions = 0
+        random.seed(0)
+        loop = asyncio.new_event_loop()
+        turns = 0
+        for _ in range(games):
+            table = game()
+            table.turn_limit = 500
+            for i in range(seats):
+                table.add_player(bot(f"Seat {i}", table))
+            loop.run_until_complete(table.run())
+            turns += table.turn_count
+        loop.close()
+        run.extra = {"turns": turns, "decisions": decisions}
+    return run, games
+
+
+@benchmark("games.snakes_and_ladders")
+def games_snakes_and_ladders():
+    return game_throughput(SnakesAndLadders, SnakesAndLaddersBot)
+
+
+@benchmark("games.shedding")
+def games_shedding():
+    return game_throughput(Shedding, SheddingBot)
+
+
+# runner
+
+def measure(run: Callable, repeat: int) -> tuple[list[float], int]:
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return times, peak
+
+
+def run_suite(names: list[str], sizes: tuple[int, ...], repeat: int) -> dict:
+    results = {}
+    for name in names:
+        factory, sized = BENCHMARKS[name]
+        for size in sizes if sized else (None,):
+            key = name if size is None else f"{name}[{size}]"
+            run, operations = factory(size) if sized else factory()
+            if run is None:
+                print(f"{key:<40} skipped")
+                continue
+
+            times, peak = measure(run, repeat)
+            best = min(times)
+            result = results[key] = {
+                "best": best, "mean": sum(times) / len(times), "repeat": repeat,
+                "operations": operations, "ops_per_sec": operations / best, "peak_bytes": peak,
+            }
+            for counter, value in getattr(run, "extra", {}).items():
+                result[f"{counter}_per_sec"] = value / best
+            print(f"{key:<40}{best * 1000:>12.2f} ms{result['ops_per_sec']:>14,.0f} ops/s{peak / 2 ** 20:>10.1f} MiB")
+            del run
+    return results
+
+
+def commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(old: dict, new: dict) -> None:
+    """Prints the time of every benchmark in new relative to old, e.g. 0.80x is 20% faster"""
+    print(f"\n{'benchmark':<40}{'old ms':>12}{'new ms':>12}{'ratio':>9}   ({old['meta']['commit']} -> {new['meta']['commit']})")
+    for key, result in new["results"].items():
+        before = old["results"].get(key)
+        if before is None: continue
+        print(f"{key:<40}{before['best'] * 1000:>12.2f}{result['best'] * 1000:>12.2f}{result['best'] / before['best']:>8.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--sizes", type=int, nargs="+", default=GRAPH_SIZES, help="node counts for graph benchmarks")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--quick", action="store_true", help="graph sizes up to 10k, 2 repeats")
+    parser.add_argument("--output", type=Path, help="JSON file to write (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", type=Path, help="JSON file of an earlier run to compare with")
+    args = parser.parse_args()
+
+    sizes, repeat = tuple(args.sizes), args.repeat
+    if args.quick:
+        sizes, repeat = tuple(size for size in sizes if size <= 10_000), 2
+
+    meta = {
+        "commit": commit(), "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(), "platform": platform.platform(),
+        "processor": platform.processor(), "cpus": os.cpu_count(), "repeat": repeat,
+    }
+    names = [name for name in BENCHMARKS if args.filter in name]
+    report = {"meta": meta, "results": run_suite(names, sizes, repeat)}
+
+    output = args.output or RESULTS / f"{meta['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"saved {output}")
+
+    if args.compare:
+        compare(json.loads(args.compare.read_text()), report)
+
+
+if __name__ == "__main__":
+    main()
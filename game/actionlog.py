@@ -0,0 +1,181 @@
+from __future__ import annotations
+from collections.abc import Callable, Iterable, Iterator
+from typing import TYPE_CHECKING, NamedTuple
+
+import mmap
+import random
+
+if TYPE_CHECKING:
+    from game import Game
+
+# Append-only binary log of games, for reproducing bugs and for analytics. Set game.action_log to an
+# ActionLog before running a game (one log can serve many tables) and every decision made in it is
+# recorded, together with the seed of the game's own generator, Game.rng.
+#
+# A decision is a player's final choice among the options offered to Player.decide: an action, but
+# also e.g. which card to discard. Replaying seeds Game.rng, runs the game again and answers every
+# decide() call from the log, so the game logic is executed but nobody is asked. Game code must
+# therefore take its chance from Game.rng (e.g. Dice.roll(count, game.rng)), not from the random
+# module, and players must not draw from Game.rng when choosing (bots use their own Bot.rng).
+# As every table has its own generator, tables interleaved on a TableScheduler replay as well.
+#
+# File format: the magic b"PGAL" and a version byte, then records of unsigned LEB128 varints:
+#   0 table seed           a game starts, Game.rng is seeded with seed
+#   1 table seat option    seat (index in game.players) chose options[option]
+#   2 table turns          the game ended after turns turns
+
+MAGIC = b"PGAL"
+VERSION = 1
+START, DECISION, END = 0, 1, 2
+
+
+def _varint(value: int, out: bytearray) -> None:
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+class ActionLog:
+    def __init__(self, path: str, buffer_size: int = 1 << 16) -> None:
+        """Appends to the log file at path, in writes of about buffer_size bytes"""
+        self.path = path
+        self.buffer_size = buffer_size
+        self._buffer = bytearray()
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._buffer += MAGIC + bytes((VERSION,))
+        self._tables: dict[int, int] = {}  # id(game): table number
+        self._next_table = 0
+
+
+    def __enter__(self) -> ActionLog:
+        return self
+
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+    def _write(self, *values: int) -> None:
+        buffer = self._buffer
+        for value in values:
+            _varint(value, buffer)
+        if len(buffer) >= self.buffer_size:
+            self.flush()
+
+
+    def start_game(self, game: Game, seed: int = None) -> int:
+        """Seeds game.rng and returns the game's table number in this log"""
+        seed = random.getrandbits(63) if seed is None else seed
+        table = self._tables[id(game)] = self._next_table
+        self._next_table += 1
+
+        game.rng.seed(seed)
+        self._write(START, table, seed)
+        return table
+
+
+    def write_decision(self, game: Game, seat: int, option: int) -> None:
+        self._write(DECISION, self._tables[id(game)], seat, option)
+
+
+    def end_game(self, game: Game) -> None:
+        self._write(END, self._tables.pop(id(game)), game.turn_count)
+
+
+    def flush(self) -> None:
+        self._file.write(self._buffer)
+        self._file.flush()
+        self._buffer.clear()
+
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+class Record(NamedTuple):
+    kind: int  # START, DECISION or END
+    table: int
+    values: tuple[int, ...]  # (seed,), (seat, option) or (turns,)
+
+
+_FIELDS = {START: 1, DECISION: 2, END: 1}
+
+
+def read(path: str) -> Iterator[Record]:
+    """Streams the records of a log file. The file is memory mapped rather than read into memory."""
+    with open(path, "rb") as file:
+        if file.seek(0, 2) == 0: return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:4] != MAGIC or data[4] != VERSION:
+                raise ValueError(f"{path} is not a version {VERSION} action log")
+
+            position, size = 5, len(data)
+            while position < size:
+                values = []
+                for _ in range(2 + _FIELDS.get(data[position], 0)):
+                    value = shift = 0
+                    while True:
+                        byte = data[position]
+                        position += 1
+                        value |= (byte & 0x7F) << shift
+                        shift += 7
+                        if byte < 0x80: break
+                    values.append(value)
+
+                yield Record(values[0], values[1], tuple(values[2:]))
+
+
+def scan(paths: Iterable[str]) -> Iterator[tuple[str, Record]]:
+    """Streams (path, record) over many log files, one file at a time"""
+    for path in paths:
+        for record in read(path):
+            yield path, record
+
+
+class GameRecord(NamedTuple):
+    seed: int
+    decisions: list[tuple[int, int]]  # (seat, option)
+    turns: int  # None if the game did not end in the log
+
+
+def games(records: Iterable[Record]) -> Iterator[GameRecord]:
+    """Groups the records of a log into games, in the order the games started"""
+    started: dict[int, GameRecord] = {}
+    for kind, table, values in records:
+        if kind == START:
+            started[table] = GameRecord(values[0], [], None)
+        elif kind == DECISION:
+            started[table].decisions.append(values)
+        elif kind == END:
+            yield started.pop(table)._replace(turns=values[0])
+
+    yield from started.values()
+
+
+async def replay(new_game: Callable[[], Game], record: GameRecord, turn: int = None) -> Game:
+    """Plays a recorded game again and returns it. new_game creates the game with the same players
+    in the same order as when it was recorded. turn stops the replay after that many turns."""
+    game = new_game()
+    decisions = iter(record.decisions)
+
+    def policy(player: Game.Player, options: list[str]) -> str:
+        seat, option = next(decisions, (None, None))
+        if seat is None:
+            raise ValueError(f"The log ends before turn {game.turn_count} of the game")
+        if player.seat != seat or option >= len(options):
+            raise ValueError(f"Replay diverged from the log at turn {game.turn_count}")
+        return options[option]
+
+    game.rng.seed(record.seed)
+    game.turn_limit = turn
+    game._policy = policy
+    try:
+        await game.run()
+    finally:
+        game._policy = None
+
+    return game
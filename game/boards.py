@@ -0,0 +1,76 @@
+from __future__ import annotations
+from typing import Mapping
+
+from graph import WeightedDirectedMultiGraph, Graph, MultiGraph, UndirectedGraph
+
+# Ready-made board shapes for BoardGame.board. Every generator takes the graph class to build
+# and passes any other keyword arguments (e.g. index_values) to its constructor.
+# Undirected connections are added both ways when a directed class is requested.
+
+
+def _build(cls: type, values: list, pairs, both_ways: bool, **kwargs) -> WeightedDirectedMultiGraph:
+    graph = cls(**kwargs)
+    nodes = graph.add_nodes_from(values)
+    both_ways = both_ways and graph.directed
+
+    def edges():
+        for i, j in pairs:
+            yield (nodes[i], nodes[j], 1) if graph.weighted else (nodes[i], nodes[j])
+            if both_ways:
+                yield (nodes[j], nodes[i], 1) if graph.weighted else (nodes[j], nodes[i])
+
+    graph.add_edges_from(edges())
+    return graph
+
+
+def ring(size: int, cls: type = Graph, both_ways: bool = False, **kwargs) -> WeightedDirectedMultiGraph:
+    """Circular track of squares 0..size-1, each leading to the next one"""
+    return _build(cls, list(range(size)), ((i, (i + 1) % size) for i in range(size)), both_ways, **kwargs)
+
+
+def square_grid(width: int, height: int, cls: type = UndirectedGraph, diagonal: bool = False, **kwargs) -> WeightedDirectedMultiGraph:
+    """Grid of (x, y) squares connected to their orthogonal (and optionally diagonal) neighbours"""
+    values = [(x, y) for y in range(height) for x in range(width)]
+
+    def pairs():
+        for y in range(height):
+            for x in range(width):
+                i = y * width + x
+                if x + 1 < width: yield i, i + 1
+                if y + 1 < height: yield i, i + width
+                if diagonal and y + 1 < height:
+                    if x + 1 < width: yield i, i + width + 1
+                    if x > 0: yield i, i + width - 1
+
+    return _build(cls, values, pairs(), True, **kwargs)
+
+
+def hex_grid(width: int, height: int, cls: type = UndirectedGraph, **kwargs) -> WeightedDirectedMultiGraph:
+    """Rhombus shaped map of hexes in axial (q, r) coordinates, each connected to its six neighbours"""
+    values = [(q, r) for r in range(height) for q in range(width)]
+
+    def pairs():
+        for r in range(height):
+            for q in range(width):
+                i = r * width + q
+                if q + 1 < width: yield i, i + 1
+                if r + 1 < height:
+                    yield i, i + width
+                    if q > 0: yield i, i + width - 1
+
+    return _build(cls, values, pairs(), True, **kwargs)
+
+
+def jump_board(size: int, jumps: Mapping[int, int], sides: int = 6, cls: type = MultiGraph, **kwargs) -> WeightedDirectedMultiGraph:
+    """Snakes and ladders style board of squares 0..size-1. \n
+    Every square has one edge per die face, leading to the square a move of that many steps ends on,
+    after following jumps (ladders and snakes) {from: to}. Moves past the last square are dropped.
+    In a multigraph the number of parallel edges to a square is the number of faces that reach it."""
+    def pairs():
+        for i in range(size):
+            if i in jumps: continue  # nobody stays on the start of a jump
+            for step in range(1, sides + 1):
+                if i + step < size:
+                    yield i, jumps.get(i + step, i + step)
+
+    return _build(cls, list(range(size)), pairs(), False, **kwargs)
@@ -0,0 +1,42 @@
+from __future__ import annotations
+from collections.abc import Sequence
+
+from game import FrenchCard
+
+import numpy as np
+
+# Shuffling and dealing thousands of decks in one call for bulk simulations. Decks are arrays of
+# card ids (FrenchCard.id), one row per game. Feed a row to CardGame.deal_hands to set up a table.
+# Requires NumPy, unlike the rest of the package.
+
+
+def deck_ids(deck: Sequence[FrenchCard]) -> np.ndarray:
+    """Card ids of a deck such as DECK_52, in deck order"""
+    return np.fromiter((card.id for card in deck), dtype=np.int8, count=len(deck))
+
+
+def shuffle_decks(deck: Sequence[FrenchCard], games: int, rng: np.random.Generator | int = None) -> np.ndarray:
+    """Returns a (games, len(deck)) array holding an independent permutation of deck per row"""
+    rng = np.random.default_rng(rng)
+    return rng.permuted(np.broadcast_to(deck_ids(deck), (games, len(deck))), axis=1)
+
+
+def deal(deck: Sequence[FrenchCard], games: int, players: int, hand_limit: int, rng: np.random.Generator | int = None) -> tuple[np.ndarray, np.ndarray]:
+    """Shuffles games decks and deals hand_limit cards to each player, one card at a time from the top. \n
+    Returns hands of shape (games, players, hand_limit) and the undealt stock of shape (games, rest),
+    whose last column is the top of the pile, as CardGame.Player.draw_card expects."""
+    dealt = players * hand_limit
+    if dealt > len(deck):
+        raise ValueError(f"Cannot deal {dealt} cards from a deck of {len(deck)}")
+
+    decks = shuffle_decks(deck, games, rng)
+    top_first = decks[:, ::-1]
+    hands = top_first[:, :dealt].reshape(games, hand_limit, players).transpose(0, 2, 1)
+    stock = decks[:, :len(deck) - dealt]
+
+    return np.ascontiguousarray(hands), stock
+
+
+def hand_masks(hands: np.ndarray) -> np.ndarray:
+    """Hand masks (see Hand) of an array of card ids, reducing the last axis"""
+    return np.bitwise_or.reduce(np.left_shift(np.uint64(1), hands.astype(np.uint64)), axis=-1)
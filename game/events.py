@@ -0,0 +1,112 @@
+from __future__ import annotations
+from collections.abc import Callable
+from inspect import isawaitable
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from game import Game
+
+# Out-of-turn reactions ("counter", "interrupt", "on card played") as event handlers instead of
+# choices polled after every action. Handlers subscribe to an event class and also receive its
+# subclasses' events. Emitting only walks the handlers subscribed to that type, highest priority first.
+
+
+class Event:
+    cancellable = False
+
+
+    def __init__(self, game: Game) -> None:
+        self.game = game
+        self.cancelled = False
+
+
+    def cancel(self) -> None:
+        """Stops the event: no further handlers are called and, for cancellable events, the game skips what it announced"""
+        if not self.cancellable:
+            raise TypeError(f"{type(self).__name__} cannot be cancelled")
+        self.cancelled = True
+
+
+class PlayerActionEvent(Event):
+    """Base of ActionEvent and ActionPerformed. Subscribing to it receives both, before and after every action."""
+    def __init__(self, game: Game, player: Game.Player, action: Game.Player.Action, kwargs: dict) -> None:
+        super().__init__(game)
+        self.player = player
+        self.action = action
+        self.kwargs = kwargs
+
+
+class ActionEvent(PlayerActionEvent):
+    """A player is about to perform an action. Cancelling it prevents the action (e.g. a counter spell)."""
+    cancellable = True
+
+
+class ActionPerformed(PlayerActionEvent):
+    """A player has performed an action"""
+
+
+class PhaseStarted(Event):
+    def __init__(self, game: Game, player: Game.Player, phase) -> None:
+        super().__init__(game)
+        self.player = player
+        self.phase = phase
+
+
+Handler = Callable[[Event], Any]
+
+
+class EventBus:
+    def __init__(self) -> None:
+        # event type: [(-priority, order, handler, owner)], kept sorted
+        self._handlers: dict[type, list[tuple[int, int, Handler, Any]]] = {}
+        # event type: handlers of it and its base classes in call order, built on first emit
+        self._dispatch: dict[type, tuple[Handler, ...]] = {}
+        self._subscriptions = 0  # keeps equal priorities in subscription order
+
+
+    def subscribe(self, event_type: type[Event], handler: Handler, priority: int = 0, owner: Any = None) -> Handler:
+        """Calls handler(event) for every event of event_type or a subclass. Higher priorities are called first,
+        equal ones in subscription order. Handlers may be coroutine functions. Owner is used by unsubscribe_all."""
+        handlers = self._handlers.setdefault(event_type, [])
+        self._subscriptions += 1
+        handlers.append((-priority, self._subscriptions, handler, owner))
+        handlers.sort(key=lambda entry: entry[:2])
+        self._dispatch.clear()
+        return handler
+
+
+    def unsubscribe(self, event_type: type[Event], handler: Handler) -> None:
+        handlers = self._handlers.get(event_type, [])
+        handlers[:] = [entry for entry in handlers if entry[2] != handler]
+        self._dispatch.clear()
+
+
+    def unsubscribe_all(self, owner: Any) -> None:
+        """Removes every handler subscribed with owner, e.g. when a player leaves"""
+        for handlers in self._handlers.values():
+            handlers[:] = [entry for entry in handlers if entry[3] is not owner]
+        self._dispatch.clear()
+
+
+    def handlers(self, event_type: type[Event]) -> tuple[Handler, ...]:
+        dispatch = self._dispatch.get(event_type)
+        if dispatch is None:
+            entries = [entry for cls in event_type.__mro__ for entry in self._handlers.get(cls, ())]
+            dispatch = self._dispatch[event_type] = tuple(entry[2] for entry in sorted(entries, key=lambda entry: entry[:2]))
+        return dispatch
+
+
+    def has_subscribers(self, event_type: type[Event]) -> bool:
+        """Lets callers skip creating events nobody listens to"""
+        return bool(self.handlers(event_type))
+
+
+    async def emit(self, event: Event) -> Event:
+        """Calls the event's handlers in priority order until one cancels it. Returns the event."""
+        for handler in self.handlers(type(event)):
+            result = handler(event)
+            if isawaitable(result):
+                await result
+            if event.cancelled: break
+
+        return event
@@ -1,14 +1,24 @@
 from __future__ import annotations
-from collections.abc import Sequence
+from collections.abc import Awaitable, Iterable, Sequence
 from enum import Enum
 from abc import ABC, abstractmethod
 from typing import Callable, Any
-from random import randint, shuffle, choice
+from fractions import Fraction
+from functools import lru_cache
+from inspect import isawaitable
+from time import perf_counter
 from program import Program
+from events import ActionEvent, ActionPerformed, EventBus, PhaseStarted
+from statemachine import StateMachine
+from undo import UndoStack
+from actionlog import ActionLog
+from turnorder import TurnOrder
+from profiling import Profiler
 
 from graph import Graph
 
 import asyncio
+import random
 
 # TODO: Error checking. Unit tests.
 # TODO: Fix type hinting
@@ -17,13 +27,19 @@ import asyncio
 class Game(Program, ABC):
     class Player(ABC):
         class Action:
-            def __init__(self, player: Game.Player, predicate: Callable[[Game.Player], bool], callback: Callable[[Game.Player, Any], None]) -> None:
+            def __init__(self, player: Game.Player, predicate: Callable[[Game.Player], bool], callback: Callable[[Game.Player, Any], None],
+                         depends: Sequence[str] = None) -> None:
                 """An action that a player can perform during his turn or out of turn. \n
                 Predicate defines if the player can legally perfomr the action. \n
-                Callback alters the state of the player and/or the game."""
+                Callback alters the state of the player and/or the game. It may be a coroutine function, e.g. one that
+                awaits a further choice of the player with Player.choose. \n
+                Depends names the state keys the predicate reads, e.g. ("phase", "hand"). The player caches
+                the predicate's result until one of them is invalidated. None means it is evaluated every time."""
                 self.player = player
                 self.predicate = predicate
                 self.callback = callback
+                self.depends = None if depends is None else tuple(depends)
+                self.name: str = None  # set by Player.add_choice
 
 
             @property
@@ -32,12 +48,34 @@ class Game(Program, ABC):
             
             
             async def run(self, **kwargs) -> None:
-                self.callback(self.player, **kwargs)
+                """Performs the action, unless an ActionEvent handler cancels it"""
+                game = self.player.game
+                events = game.events
+                if events.has_subscribers(ActionEvent):
+                    event = await events.emit(ActionEvent(game, self.player, self, kwargs))
+                    if event.cancelled: return
+
+                game.undo_stack.begin_action()
+                profiler = game.profiler
+                if profiler is None or game.simulating:
+                    result = self.callback(self.player, **kwargs)
+                    if isawaitable(result):
+                        await result
+                else:
+                    start = perf_counter()
+                    result = self.callback(self.player, **kwargs)
+                    if isawaitable(result):
+                        await result
+                    profiler.action(self.name, perf_counter() - start)
+
+                if events.has_subscribers(ActionPerformed):
+                    await events.emit(ActionPerformed(game, self.player, self, kwargs))
 
 
         def __init__(self, name: str, game: Game) -> None:
             self.name = name
             self.game = game
+            self.seat: int = None  # index in game.players, kept up to date by the game
             self.is_eliminated = False
             self.checkbox = None
             self.radio = None
@@ -47,6 +85,15 @@ class Game(Program, ABC):
             # name is returned by the abstract input_handler() method. It can be 
             # from any source: console, GUI input, http request, ...
             self.choices: dict[str, Game.Player.Action] = dict()
+
+            # legality cache, see legal_actions()
+            self._versions: dict[str, int] = {}  # state key: version, for keys owned by this player
+            self._dependents: dict[str, set[str]] = {}  # state key: names of the choices depending on it
+            self._seen: dict[str, int] = {}  # state key: version the cached results were computed at
+            self._legal: dict[str, bool] = {}
+            self._stale: set[str] = set()
+            self._dynamic = 0  # number of choices without depends
+            self._options: list[str] = None
             
             # TODO: come up with a better logic for end of turn, end of phase
             # self.add_choice(name="End of turn", predicate=lambda self: self.game.current_phase == "Play", callback=lambda self: (self.is_playing = False))
@@ -59,8 +106,88 @@ class Game(Program, ABC):
             return self.radio(options)
 
 
-        def add_choice(self, name: str, predicate: Callable[[Game.Player], bool], callback: Callable[[Game.Player, Any], None]) -> None:
-            self.choices[name] = Game.Player.Action(self, predicate, callback)
+        def default_action(self, options: Sequence[str]) -> str:
+            """Choice made for a player who does not decide within the game's decision_timeout"""
+            return options[0]
+
+
+        def add_choice(self, name: str, predicate: Callable[[Game.Player], bool], callback: Callable[[Game.Player, Any], None],
+                       depends: Sequence[str] = None) -> None:
+            self._register(name, Game.Player.Action(self, predicate, callback, depends))
+
+
+        def remove_choice(self, name: str) -> None:
+            old = self.choices.pop(name)
+            if old.depends is None: self._dynamic -= 1
+            for key in old.depends or ():
+                self._dependents[key].discard(name)
+            
+            self._legal.pop(name, None)
+            self._stale.discard(name)
+            self._options = None
+
+
+        def _register(self, name: str, action: Action) -> None:
+            if name in self.choices:
+                self.remove_choice(name)
+            
+            action.name = name
+            self.choices[name] = action
+            if action.depends is None:
+                self._dynamic += 1
+            for key in action.depends or ():
+                self._dependents.setdefault(key, set()).add(name)
+            
+            self._legal.pop(name, None)
+            self._stale.add(name)
+            self._options = None
+
+
+        def invalidate(self, *keys: str) -> None:
+            """Marks state owned by this player, such as "hand", as changed"""
+            for key in keys:
+                self._versions[key] = self._versions.get(key, 0) + 1
+            if self.game.undo_stack.recording:
+                self.game.undo_stack.record(lambda: self.invalidate(*keys))
+
+
+        def legal_actions(self) -> list[str]:
+            """Names of the choices that are legal now, in registration order. \n
+            Only predicates whose depends were invalidated since the last call (on the player or the game)
+            are evaluated again, plus those without depends. The list is shared, do not modify it."""
+            game_versions = self.game._versions
+            for key, names in self._dependents.items():
+                version = game_versions.get(key, 0) + self._versions.get(key, 0)
+                if self._seen.get(key) != version:
+                    self._seen[key] = version
+                    self._stale |= names
+
+            profiler = self.game.profiler
+            if profiler is not None and self.game.simulating:
+                profiler = None
+
+            changed = False
+            for name in self._stale:
+                legal = self.choices[name].is_legal
+                changed |= self._legal.get(name) != legal
+                self._legal[name] = legal
+                if profiler is not None: profiler.predicate(name)
+            self._stale.clear()
+
+            if self._dynamic:
+                options = []
+                for name, action in self.choices.items():
+                    if action.depends is None:
+                        legal = action.is_legal
+                        if profiler is not None: profiler.predicate(name)
+                    else:
+                        legal = self._legal[name]
+                    if legal: options.append(name)
+                return options
+
+            if changed or self._options is None:
+                self._options = [name for name in self.choices if self._legal[name]]
+            return self._options
 
 
         async def play(self) -> None:
@@ -68,44 +195,99 @@ class Game(Program, ABC):
             # TODO: action menu vs move menu. A player may have lost, but still should have access to menu
             # cointinue playing while it's player's turn
 
-            options = [name for name, action in self.choices.items() if action.is_legal]
-            action = options[0] if len(options) == 1 else await self.choose_action(options)
+            options = self.legal_actions()
+            if not options: return
 
-            # TODO: what to do if there are no options?
+            await self.choices[await self.choose(options)].run()
 
-            await self.choices[action].run()
+
+        async def choose(self, options: Sequence[str]) -> str:
+            """The player's final choice among options, e.g. an action or a card to discard. Awaits players
+            who choose asynchronously (within Game.decision_timeout) and records the choice in the action log."""
+            # bots choose synchronously, humans may have to be awaited
+            profiler = self.game.profiler
+            start = perf_counter() if profiler is not None else 0.0
+            choice = self.decide(options)
+            if isawaitable(choice):
+                choice = await self._await_decision(choice, options)
+            if profiler is not None and not self.game.simulating:
+                profiler.decision(perf_counter() - start)
+            self._record_decision(options, choice)
+            return choice
 
         
+        def decide(self, options: Sequence[str]) -> str | Awaitable[str]:
+            """The player's choice among options, or an awaitable of it. \n
+            While the game is being searched by a bot, the search policy chooses for every player."""
+            policy = self.game._policy
+            if policy is not None:
+                return policy(self, options)
+            return options[0] if len(options) == 1 else self.choose_action(options)
+
+
+        def _record_decision(self, options: Sequence[str], action: str) -> None:
+            # every final decide() result goes to the game's action log, so that a replay can feed them back
+            log = self.game.action_log
+            if log is not None and not self.game.simulating:
+                log.write_decision(self.game, self.seat, options.index(action))
+
+
+        async def _await_decision(self, decision: Awaitable[str], options: Sequence[str]) -> str:
+            timeout = self.game.decision_timeout
+            if timeout is None:
+                return await decision
+            
+            try:
+                return await asyncio.wait_for(decision, timeout)
+            except asyncio.TimeoutError:
+                return self.default_action(options)
+
+        
+        def subscribe(self, event_type: type, handler: Callable, priority: int = 0) -> Callable:
+            """Reacts to game events out of turn, see events.EventBus.subscribe. Unsubscribed when leaving the game."""
+            return self.game.events.subscribe(event_type, handler, priority, owner=self)
+
+
         def leave_game(self) -> None:
             # TODO: on leave event
-            self.game.players.remove(self)
-            pass
+            if self.seat is None: return  # left already
+            self.game.events.unsubscribe_all(self)
+            self.game.remove_player(self)
                     
 
         def __str__(self) -> str:
             return "Game.Player" + self.name
+    
+
+    class State(Enum):
+        START = 1
+        SETUP = 2
+        LOOP = 3
+        END = 4
             
 
     def __init__(self):
-        self.players: set[Game.Player] = set()
+        # a list, not a set, so that seating and turn order are reproducible for a given random seed
+        self.players: list[Game.Player] = []  # in seat order, see remove_player
         self.min_player_count = 2
         self.max_player_count = 6
         self._is_game_over = False
-        self.game_process = Graph()
-
-        self.current_state = self.game_process.add_node(Game.setup)
-        
-
-        self.process = [
-            {Game.State.START: self._start_program},
-            {
-                Game.State.SETUP: self.setup,
-                Game.State.LOOP: self._loop_wrapper
-            },
-            {}
-        ]
-
-        self.current_state = None
+        self.turn_count = 0
+        self.turn_limit: int = None  # stop the game loop after this many turns, e.g. in simulations
+        self._versions: dict[str, int] = {}  # state key: version, see Player.legal_actions
+        self.decision_timeout: float = None  # seconds a player may take to choose, see Player.default_action
+        self.cooperative = False  # yield to the event loop after every turn, so other tables can play
+        self.events = EventBus()
+        self.undo_stack = UndoStack()  # changes recorded for lookahead, see checkpoint()
+        self._policy: Callable[[Game.Player, Sequence[str]], str] = None  # chooses for everyone while simulating
+        self.action_log: ActionLog = None  # records the game for replays, see actionlog.py
+        self.profiler: Profiler = None  # opt-in timings and counts, see profiling.py
+        self.current_state: Game.State = None
+        # dice, shuffles and other chance of this table. Seeded per game by the action log, so that a game can be
+        # replayed although other tables draw from their own generators in between. Bots choose with their own Bot.rng.
+        self.rng = random.Random(random.getrandbits(64))
+        self._pass: list[Game.Player] = []  # players of the current pass of the game loop
+        self._playing = 0  # position of the player who plays in self._pass
 
     
     @property
@@ -115,19 +297,64 @@ class Game(Program, ABC):
     
     def add_user(self, name: str) -> Player:
         player = Game.Player(name=name, game=self)
-        self.players.add(player)
+        return self.add_player(player)
+    
+
+    @property
+    def players(self) -> list[Game.Player]:
+        # players who left are dropped on first use after they left, so that leaving is O(1) and
+        # many players leaving at once cost one pass over the list
+        if self._vacated:
+            self._players[:] = [player for player in self._players if player.seat is not None]
+            self._vacated = 0
+            self._number_seats()
+        return self._players
+
+
+    @players.setter
+    def players(self, players: list[Game.Player]) -> None:
+        self._players = players
+        self._vacated = 0
+
+
+    def add_player(self, player: Player) -> Player:
+        player.seat = len(self.players)
+        self._players.append(player)
         return player
+
+
+    def remove_player(self, player: Player) -> None:
+        """Takes player out of players in O(1). The other players keep their order, and their seats
+        are renumbered when players is next used."""
+        if player.game is not self or player.seat is None:
+            raise ValueError(f"{player} is not seated at this table")
+        player.seat = None
+        self._vacated += 1
+
+
+    def invalidate(self, *keys: str) -> None:
+        """Marks game state, such as "phase", as changed for every player's legality cache"""
+        for key in keys:
+            self._versions[key] = self._versions.get(key, 0) + 1
+        # rolled back state has to be re-checked as well
+        if self.undo_stack.recording:
+            self.undo_stack.record(lambda: self.invalidate(*keys))
     
 
+    def _number_seats(self) -> None:
+        """Updates Player.seat after the players were reordered"""
+        for seat, player in enumerate(self._players):
+            player.seat = seat
+
+
     def discard_user(self, player: Player) -> Player:
-        if isinstance(player, Game.Player):
-            self.players.discard(player)        
+        if isinstance(player, Game.Player) and player.game is self and player.seat is not None:
+            player.leave_game()
 
 
     def add_bot(self, name: str) -> Bot:
         bot = Bot(name, self)
-        self.players.add(bot)
-        return bot
+        return self.add_player(bot)
     
 
     def discard_bot(self, bot: Bot) -> Bot:
@@ -145,7 +372,8 @@ class Game(Program, ABC):
     @abstractmethod
     def setup(self) -> None:
         # Setting up player order
-        shuffle(self.players)
+        self.rng.shuffle(self.players)
+        self._number_seats()
         self.winners: list[Game.Player] = []
         self.losers: list[Game.Player] = []
 
@@ -157,25 +385,125 @@ class Game(Program, ABC):
         pass
     
 
+    def checkpoint(self) -> tuple[int, int]:
+        """Marks the current state, to return to it with rollback(mark) after trying moves"""
+        return self.undo_stack.checkpoint()
+
+
+    def rollback(self, mark: tuple[int, int]) -> None:
+        self.undo_stack.rollback(mark)
+
+
+    def undo(self) -> None:
+        """Reverts the last action. Needs undo_stack.enabled or an open checkpoint."""
+        self.undo_stack.undo()
+
+
+    @property
+    def simulating(self) -> bool:
+        """True while a bot plays the game ahead to evaluate a move, see mcts.MCTSBot"""
+        return self._policy is not None
+
+
+    async def _resume(self, player: Player, option: str) -> None:
+        """Runs player's choice of option at the decision the game is waiting on, then plays the game on
+        to the end without changing turn order. Used by search bots, which roll the game back afterwards."""
+        await player.choices[option].run()
+        self.undo_stack.setattr(self, "turn_count", self.turn_count + 1)
+        if self.is_game_over: return
+        if await self._play_pass(self._playing + 1): return
+
+        self.loop()
+        await self._loop_wrapper()
+
+
+    @property
+    def is_turn_limit_reached(self) -> bool:
+        return self.turn_limit is not None and self.turn_count >= self.turn_limit
+
+
     async def _loop_wrapper(self):
-        while not self.is_game_over:
-            for player in self.players:
-                player.play()
-            return self.loop()
+        while not self.is_game_over and not self.is_turn_limit_reached:
+            self.undo_stack.setattr(self, "_pass", self.players.copy())
+            if await self._play_pass(0): return
+            
+            self.loop()
 
 
-    def _start_program(self):
-        """Run setup_game, run game loop asyncronously and return a tuple of winners and losers"""
-        self.setup()
+    async def _play_pass(self, first: int) -> bool:
+        """Lets the players of the current pass play once each, from position first on. Returns True if the game ended."""
+        players = self._pass
+        for position in range(first, len(players)):
+            self.undo_stack.setattr(self, "_playing", position)
+            await players[position].play()
+            self.undo_stack.setattr(self, "turn_count", self.turn_count + 1)
+            if self.is_game_over: return True
+            if self.cooperative and not self.simulating: await asyncio.sleep(0)
+
+        return False
+    
+
+    async def run(self) -> tuple[list[Game.Player], list[Game.Player]]:
+        """Sets up and plays the game to the end on the running event loop. Returns winners and losers."""
+        if self.action_log is not None and not self.simulating:
+            self.action_log.start_game(self)
+        await self.state_machine().run(self)
+        if self.action_log is not None and not self.simulating:
+            self.action_log.end_game(self)
+
+        return self.winners, self.losers
+
+
+    @classmethod
+    def process(cls) -> StateMachine:
+        """States of the game, the transitions between them and their handlers. \n
+        Subclasses override this to add states or on_enter/on_exit hooks. See state_machine()."""
+        game_process = Graph()
+        start, setup, loop, end = game_process.add_nodes_from(Game.State)
+        game_process.add_edges_from(((start, setup), (setup, loop), (loop, end)))
+
+        handlers = {
+            Game.State.START: cls._start_program,
+            Game.State.SETUP: cls._setup_wrapper,
+            Game.State.LOOP: cls._loop_state,
+            Game.State.END: cls._end_program,
+        }
+        return StateMachine(game_process, handlers, start=Game.State.START)
+
+
+    @classmethod
+    def state_machine(cls) -> StateMachine:
+        """The compiled process of this class, built on first use"""
+        machine = cls.__dict__.get("_state_machine")
+        if machine is None:
+            machine = cls._state_machine = cls.process()
+        return machine
 
-        asyncio.run(self._loop_wrapper())
 
+    def _start_program(self) -> Game.State:
         return Game.State.SETUP
 
 
+    def _setup_wrapper(self) -> Game.State:
+        self.setup()
+        return Game.State.LOOP
+
+
+    async def _loop_state(self) -> Game.State:
+        await self._loop_wrapper()
+        return Game.State.END
+
+
+    def _end_program(self) -> None:
+        return None
+
+
 class Bot(Game.Player, ABC):
     def __init__(self, name: str, game: Game) -> None:
         super().__init__(name, game)
+        # private, so that choosing does not draw from game.rng, which the game's dice and shuffles use,
+        # and a replay that answers decisions from an action log draws the same numbers as the recorded game
+        self.rng = random.Random(random.getrandbits(64))
     
     
     @abstractmethod
@@ -189,15 +517,13 @@ class Bot(Game.Player, ABC):
 class ChaoticBot(Bot):
     """Bot that makes random moves"""
     def choose_action(self, options: list[str]) -> str:
-        return choice(options)
+        return self.rng.choice(options)
 
 
 class TurnBasedGame(Game, ABC):
     class Player(Game.Player, ABC):
         def __init__(self, name: str, game: TurnBasedGame) -> None:
             super().__init__(name, game)
-            self.left = None  # player to the left
-            self.right = None  # player to the right
             self.is_playing = False
 
             # choices is what actions a player can make on his turn or out of turn.
@@ -214,8 +540,27 @@ class TurnBasedGame(Game, ABC):
             return self.radio(options)
 
 
-        def add_choice(self, name: str, predicate: Callable[[TurnBasedGame.Player], bool], callback: Callable[[TurnBasedGame.Player, Any], None]) -> None:
-            self.choices[name] = TurnBasedGame.Player.Action(self, predicate, callback)
+        def add_choice(self, name: str, predicate: Callable[[TurnBasedGame.Player], bool], callback: Callable[[TurnBasedGame.Player, Any], None],
+                       depends: Sequence[str] = None) -> None:
+            self._register(name, TurnBasedGame.Player.Action(self, predicate, callback, depends))
+
+
+        @property
+        def left(self) -> TurnBasedGame.Player:
+            """Player to the left, who plays next when the game goes clockwise"""
+            return self.game.turn_order.left_of(self)
+
+
+        @property
+        def right(self) -> TurnBasedGame.Player:
+            return self.game.turn_order.right_of(self)
+
+
+        def leave_game(self) -> None:
+            order = self.game.turn_order
+            if order is not None and self in order:
+                order.remove(self)
+            super().leave_game()
                     
 
         def __str__(self) -> str:
@@ -244,15 +589,19 @@ class TurnBasedGame(Game, ABC):
     #         if self.is_game_over: break
     #     self.current_player.is_playing = False
 
-    # TODO: create @out_of_turn and @at_the_same_time decorator
+    # TODO: create @out_of_turn decorator
 
 
     def __init__(self):
+        super().__init__()
         self.turn_phases: list[TurnBasedGame.TurnPhase] = [TurnBasedGame.TurnPhase.DRAW, TurnBasedGame.TurnPhase.PLAY]
-        self.current_phase: TurnBasedGame.TurnPhase = ""
+        self.simultaneous_phases: set[TurnBasedGame.TurnPhase] = set()  # phases in which all players decide at once
+        self._current_phase: TurnBasedGame.TurnPhase = ""
+        self._current_player: TurnBasedGame.Player = None
         self.players: list[TurnBasedGame.Player] = []
         self.min_player_count = 2
         self.max_player_count = 6
+        self.turn_order: TurnOrder = None  # built by setup
         self.clockwise = True
         self._is_game_over = False
 
@@ -261,61 +610,252 @@ class TurnBasedGame(Game, ABC):
     @abstractmethod
     def is_game_over(self) -> bool:
         """Checks the current state of the game. If the game is over, set self.winners and self.losers"""
-        self.is_game_over = True
         return self._is_game_over
 
 
+    @property
+    def current_phase(self) -> TurnBasedGame.TurnPhase:
+        return self._current_phase
+
+
+    @current_phase.setter
+    def current_phase(self, phase: TurnBasedGame.TurnPhase) -> None:
+        self.undo_stack.setattr(self, "_current_phase", phase)
+        self.invalidate("phase")
+
+
+    @property
+    def current_player(self) -> TurnBasedGame.Player:
+        return self._current_player
+
+
+    @current_player.setter
+    def current_player(self, player: TurnBasedGame.Player) -> None:
+        self.undo_stack.setattr(self, "_current_player", player)
+        self.invalidate("current_player")
+
+
+    @property
+    def clockwise(self) -> bool:
+        return self._clockwise if self.turn_order is None else self.turn_order.clockwise
+
+
+    @clockwise.setter
+    def clockwise(self, clockwise: bool) -> None:
+        order = self.turn_order
+        if order is None:
+            self._clockwise = clockwise
+        elif clockwise != order.clockwise:
+            if self.undo_stack.recording:
+                position = order.position
+                self.undo_stack.record(lambda: setattr(order, "position", position))
+            order.reverse()
+
+
+    @property
+    def round_count(self) -> int:
+        """Number of completed rounds. A round ends when the turn is back at the seat that started it.
+        Reversing the direction abandons the round in progress and starts a new one."""
+        return self.turn_order.rounds
+
+
     def next_player(self) -> TurnBasedGame.Player:
-        return self.current_player.left if self.clockwise else self.current_player.right
+        """Player who plays after the current one, skipping eliminated players"""
+        order = self.turn_order
+        player = order.next()
+        for _ in range(len(order) - 1):
+            if not player.is_eliminated: break
+            player = order.next(player)
+        return player
+
+
+    def eliminate(self, player: TurnBasedGame.Player) -> None:
+        """Marks player as eliminated and takes their seat out of the turn order"""
+        self.undo_stack.setattr(player, "is_eliminated", True)
+        if player in self.turn_order and len(self.turn_order) > 1:
+            self._unseat(player)
 
 
-    def turn(self) -> None:
-        self.current_player.is_playing = True
-        for phase in self.turn_phases:
+    def _unseat(self, player: TurnBasedGame.Player) -> None:
+        order = self.turn_order
+        if self.undo_stack.recording:
+            position = order.position
+            self.undo_stack.record(lambda: (order.restore(player), setattr(order, "position", position)))
+        order.remove(player)
+
+
+    async def turn(self, first_phase: int = 0) -> None:
+        self.undo_stack.setattr(self.current_player, "is_playing", True)
+        profiler = self.profiler if not self.simulating else None
+        for phase in self.turn_phases[first_phase:]:
+            start = perf_counter() if profiler is not None else 0.0
             self.current_phase = phase
-            self.current_player.play()
+            if self.events.has_subscribers(PhaseStarted):
+                await self.events.emit(PhaseStarted(self, self.current_player, phase))
+            if phase in self.simultaneous_phases:
+                await self.resolve_simultaneous(await self.decide_simultaneously())
+            else:
+                await self.current_player.play()
+            if profiler is not None:
+                profiler.phase(phase, perf_counter() - start)
             if self.is_game_over: break
-        self.current_player.is_playing = False
+        self.undo_stack.setattr(self.current_player, "is_playing", False)
+        self.undo_stack.setattr(self, "turn_count", self.turn_count + 1)
+
+
+    async def decide_simultaneously(self, players: Iterable[TurnBasedGame.Player] = None) -> dict[TurnBasedGame.Player, str]:
+        """Asks every player (default: all who are not eliminated) to choose at the same time, e.g. to bid. \n
+        Decisions are awaited concurrently under one shared decision_timeout; players who miss it get
+        their default_action. Returns {player: choice} in seating order, without running the choices."""
+        players = [player for player in (self.players if players is None else players) if not player.is_eliminated]
+        decisions: dict[TurnBasedGame.Player, str] = {}
+        asked: dict[TurnBasedGame.Player, list[str]] = {}
+        pending: dict[TurnBasedGame.Player, asyncio.Future] = {}
+
+        for player in players:
+            options = player.legal_actions()
+            if not options: continue
+
+            asked[player] = list(options)
+            action = player.decide(options)
+            if isawaitable(action):
+                pending[player] = asyncio.ensure_future(action)
+            decisions[player] = action
+
+        if pending:
+            done, late = await asyncio.wait(pending.values(), timeout=self.decision_timeout)
+            for future in late:
+                future.cancel()
+
+            for player, future in pending.items():
+                decisions[player] = future.result() if future in done else player.default_action(asked[player])
+
+        for player, action in decisions.items():
+            player._record_decision(asked[player], action)
+        return decisions
+
+
+    async def resolve_simultaneous(self, decisions: dict[TurnBasedGame.Player, str]) -> None:
+        """Runs the choices made in a simultaneous phase. Runs them in seating order by default,
+        games where the outcome depends on all choices at once (e.g. highest bid wins) override this."""
+        for player, action in decisions.items():
+            await player.choices[action].run()
+
+    # TODO: create @out_of_turn decorator
+
+    async def _loop_wrapper(self):
+        while not self.is_game_over and not self.is_turn_limit_reached:
+            await self.turn()
+            if self.is_game_over: return
+            if self.cooperative and not self.simulating: await asyncio.sleep(0)
+
+            self.loop()
+
+
+    async def _resume(self, player: TurnBasedGame.Player, option: str) -> None:
+        phase = self.current_phase
+        if phase in self.simultaneous_phases:
+            # the others choose as well (their search policy answers at once), then all choices are resolved
+            others = await self.decide_simultaneously([other for other in self.players if other is not player])
+            await self.resolve_simultaneous({other: option if other is player else others[other]
+                                             for other in self.players if other is player or other in others})
+        else:
+            await player.choices[option].run()
+
+        if self.is_game_over: return
+        await self.turn(self.turn_phases.index(phase) + 1)
+        if self.is_game_over: return
+
+        self.loop()
+        await self._loop_wrapper()
 
-    # TODO: create @out_of_turn and @at_the_same_time decorator
 
     @abstractmethod
     def setup(self) -> None:
         # Setting up player order
-        shuffle(self.players)
+        self.rng.shuffle(self.players)
+        self._number_seats()
         self.winners: list[TurnBasedGame.Player] = []
         self.losers: list[TurnBasedGame.Player] = []
 
-        # setting left and right players
-        self.players.insert(0, self.players[-1])
-        self.players.append(self.players[1])
-        for i in range(1, len(self.players) - 2):
-            self.players[i].left = self.players[i + 1]
-            self.players[i].right = self.players[i - 1]
-        
-        self.players.pop()
-        self.players.pop(0)
-        self.current_player: TurnBasedGame.Player = self.players[0]
+        # seating players clockwise in list order
+        self.turn_order = TurnOrder(self.players, self.clockwise)
+        self.current_player = self.turn_order.current_player
 
 
     @abstractmethod
     def loop(self) -> None:
-        # TODO: add rounds. One round is when all players have played once
-        self.turn(self.current_player)
-        self.current_player = self.next_player()
+        """Called after every turn. Passes the turn to the next player."""
+        order = self.turn_order
+        # players eliminated by setting is_eliminated rather than with eliminate() leave the turn order here
+        player = order.next()
+        while player.is_eliminated and len(order) > 1:
+            self._unseat(player)
+            player = order.next()
+
+        if self.undo_stack.recording:
+            position = order.position
+            self.undo_stack.record(lambda: setattr(order, "position", position))
+        self.current_player = order.advance()
         return super().loop()
 
 
 class Dice():
-    def __init__(self, sides: list = [1, 2, 3, 4, 5, 6]) -> None:
-        self.sides = sides
+    def __init__(self, sides: Sequence = (1, 2, 3, 4, 5, 6)) -> None:
+        self.sides = tuple(sides)
+
 
-    def roll(self, times: int = 1) -> list:
-        rolls = []
-        for i in range(times):
-            rolls.append(choice(self.sides))
+    def roll(self, times: int = 1, rng: random.Random = None) -> list:
+        """rng is the generator to roll with, usually the game's Game.rng (default: the random module)"""
+        return (random if rng is None else rng).choices(self.sides, k=times)
+    
+
+    def roll_many(self, dice: int, games: int, rng=None):
+        """Rolls dice dice for each of games games in one vectorised call. \n
+        Returns a NumPy array of shape (games, dice). rng is a NumPy Generator or seed. Requires NumPy."""
+        import numpy as np
+
+        rng = np.random.default_rng(rng)
+        return np.asarray(self.sides)[rng.integers(0, len(self.sides), size=(games, dice))]
+
+
+    def distribution(self, count: int = 1) -> dict[Any, Fraction]:
+        """Exact probability of every sum of count dice. Computed once per side list and count."""
+        return _sum_distribution(self.sides, count).copy()
+    
+
+    def probability(self, value, count: int = 1) -> Fraction:
+        return _sum_distribution(self.sides, count).get(value, Fraction(0))
+
+
+    def expected_value(self, count: int = 1, score: Callable[[Any], float] = None) -> Fraction:
+        """Expected score of the sum of count dice (default: the sum itself)"""
+        counts = _sum_counts(self.sides, count)
+        score = score or (lambda value: value)
+        return sum(Fraction(ways) * score(value) for value, ways in counts.items()) / len(self.sides) ** count
+
+
+@lru_cache(maxsize=None)
+def _sum_counts(sides: tuple, count: int) -> dict:
+    """Number of ways count dice with these sides reach every sum, by convolving one die at a time"""
+    if count == 0:
+        return {0: 1}
+
+    counts = {}
+    for value, ways in _sum_counts(sides, count - 1).items():
+        for side in sides:
+            counts[value + side] = counts.get(value + side, 0) + ways
+    
+    return counts
+
+
+@lru_cache(maxsize=None)
+def _sum_distribution(sides: tuple, count: int) -> dict:
+    total = len(sides) ** count
+    return {value: Fraction(ways, total) for value, ways in _sum_counts(sides, count).items()}
 
-        return rolls
+
+D6 = Dice()
 
         
 class Card(ABC):
@@ -349,10 +889,113 @@ class FrenchCard(Card):
         super().__init__(name)
         self.rank = rank
         self.suit = suit
+        # 0..51, suit by suit. Bit id of a card in a Hand mask.
+        self.id = (suit.value - 1) * 13 + rank - 1
 
     
     def __lt__(self, other: FrenchCard) -> bool:
-        return self.number < other.number
+        return (self.rank, self.suit.value) < (other.rank, other.suit.value)
+
+
+class Hand:
+    """Set of French cards stored as a 52 bit mask, bit card.id per card. \n
+    Adding, removing, membership, suit and rank queries and set operations between hands are
+    single integer operations. Supports the list methods CardGame uses (append, remove, copy)."""
+    __slots__ = ("mask",)
+
+
+    def __init__(self, cards: Iterable[FrenchCard] = (), mask: int = 0) -> None:
+        for card in cards:
+            mask |= 1 << card.id
+        self.mask = mask
+
+
+    def add(self, card: FrenchCard) -> None:
+        self.mask |= 1 << card.id
+
+
+    def append(self, card: FrenchCard) -> None:
+        self.mask |= 1 << card.id
+
+
+    def remove(self, card: FrenchCard) -> None:
+        bit = 1 << card.id
+        if not self.mask & bit:
+            raise ValueError(f"{card} is not in hand")
+        self.mask ^= bit
+
+
+    def discard(self, card: FrenchCard) -> None:
+        self.mask &= ~(1 << card.id)
+
+
+    def __contains__(self, card: FrenchCard) -> bool:
+        return bool(self.mask >> card.id & 1)
+
+
+    def __len__(self) -> int:
+        return self.mask.bit_count()
+
+
+    def __bool__(self) -> bool:
+        return self.mask != 0
+
+
+    def __iter__(self):
+        """Cards in id order"""
+        mask = self.mask
+        while mask:
+            low = mask & -mask
+            yield CARDS[low.bit_length() - 1]
+            mask ^= low
+
+
+    def copy(self) -> Hand:
+        return Hand(mask=self.mask)
+
+
+    def suit(self, suit: Suit) -> Hand:
+        return Hand(mask=self.mask & SUIT_MASKS[suit])
+    
+
+    def rank(self, rank: int) -> Hand:
+        return Hand(mask=self.mask & RANK_MASKS[rank])
+    
+
+    def count_suit(self, suit: Suit) -> int:
+        return (self.mask & SUIT_MASKS[suit]).bit_count()
+
+
+    def count_rank(self, rank: int) -> int:
+        return (self.mask & RANK_MASKS[rank]).bit_count()
+
+
+    def __or__(self, other: Hand) -> Hand:
+        return Hand(mask=self.mask | other.mask)
+
+
+    def __and__(self, other: Hand) -> Hand:
+        return Hand(mask=self.mask & other.mask)
+
+
+    def __sub__(self, other: Hand) -> Hand:
+        return Hand(mask=self.mask & ~other.mask)
+
+
+    def __xor__(self, other: Hand) -> Hand:
+        return Hand(mask=self.mask ^ other.mask)
+
+
+    def __eq__(self, other: Hand) -> bool:
+        return isinstance(other, Hand) and self.mask == other.mask
+
+
+    # mutable like set, so not hashable: use hand.mask as a dict key or set member
+    __hash__ = None
+
+
+    def __str__(self) -> str:
+        return " ".join(card.name for card in self)
 
 
 ACE_OF_CLUBS = FrenchCard(name="A♣️", rank=1, suit=CLUBS)
@@ -439,22 +1082,40 @@ DECK_36 = ACES + SIXES + SEVENS + EIGHTS + NINES + TENS + JACKS + QUEENS + KINGS
 DECK_52 = ACES + TWOS + THREES + FOURS + FIVES + SIXES + SEVENS + EIGHTS + NINES + TENS + JACKS + QUEENS + KINGS
 
 
+# cards by id, and bit masks for Hand
+CARDS = tuple(sorted(DECK_52, key=lambda card: card.id))
+
+SUIT_MASKS = {suit: 0x1FFF << (suit.value - 1) * 13 for suit in Suit}
+RANK_MASKS = {rank: sum(1 << card.id for card in DECK_52 if card.rank == rank) for rank in range(1, 14)}
+
+DECK_32_MASK = Hand(DECK_32).mask
+DECK_36_MASK = Hand(DECK_36).mask
+DECK_52_MASK = Hand(DECK_52).mask
+
+
 class CardGame(TurnBasedGame, ABC):
     class Player(TurnBasedGame.Player, ABC):
+        # Hand holds French cards only, games with other card types can use list
+        hand_type: type = Hand
+
+
         def __init__(self, name: str, game: CardGame) -> None:
             super().__init__(name, game)
-            self._hand: list[Card] = []
+            self._hand: Hand = self.hand_type()
             self._in_play: list[Card] = []
             
             # TODO: come up with a better logic for end of turn, end of phase
             # self.add_choice(name="End of turn", predicate=lambda self: self.game.current_phase == "Play", callback=lambda self: (self.is_playing = False))
-            self.add_choice(name="Discard card", predicate=lambda self: self.hand_size() > 0, callback=CardGame.Player.discard_card)
-            self.add_choice(name="Draw", predicate=lambda self: self.game.current_phase == "Draw", callback=CardGame.Player.draw)
-            self.add_choice(name="Play a card", predicate=lambda self: self.game.current_phase == "Play" and self.hand_size(), callback=CardGame.Player.play_card)
+            self.add_choice(name="Discard card", predicate=lambda self: self.hand_size() > 0, callback=CardGame.Player.discard_card,
+                            depends=("hand",))
+            self.add_choice(name="Draw", predicate=lambda self: self.game.current_phase == "Draw", callback=CardGame.Player.draw,
+                            depends=("phase",))
+            self.add_choice(name="Play a card", predicate=lambda self: self.game.current_phase == "Play" and self.hand_size(), callback=CardGame.Player.play_card,
+                            depends=("phase", "hand"))
 
 
         @property
-        def hand(self) -> list[Card]:
+        def hand(self) -> Hand:
             return self._hand.copy()
         
 
@@ -465,38 +1126,45 @@ class CardGame(TurnBasedGame, ABC):
 
         def roll_dice(self, count: int = 1) -> int:
             """Roll a 6 sided dice count number of times"""
-            roll = 0
-            for i in range(count):
-                roll += randint(1, 6)
-            
-            return roll
+            return sum(D6.roll(count, self.game.rng))
 
 
         def draw_card(self, pile: list[Card]) -> Card:
             """Remove a card from top (tail) of specified pile and append to player's hand"""
             card = pile.pop()
-            self.hand.append(card)
+            self._hand.append(card)
+            if self.game.undo_stack.recording:
+                self.game.undo_stack.record(lambda: (self._hand.remove(card), pile.append(card)))
+            self.invalidate("hand")
             return card
         
 
         def draw(self, pile: list[Card]) -> None:
             while self.hand_size() < self.game.hand_limit:
-                self.draw(pile)
+                self.draw_card(pile)
 
 
         def hand_size(self) -> int:
-            return len(self.hand)
+            return len(self._hand)
         
 
-        def discard_card(self, pile: list[Card]) -> None:
-            card = self.choose_action([card.name for card in self.hand])
-            self.hand.remove(card)
+        async def discard_card(self, pile: list[Card]) -> None:
+            names = [card.name for card in self._hand]
+            name = await self.choose(names)
+            card = next(card for card in self._hand if card.name == name)
+            self._hand.remove(card)
             pile.append(card)
+            if self.game.undo_stack.recording:
+                self.game.undo_stack.record(lambda: (pile.pop(), self._hand.append(card)))
+            self.invalidate("hand")
         
 
-        def play_card(self, card: Card, callback=lambda: None) -> None:
+        def play_card(self, card: Card, callback=lambda card: None) -> None:
             self._hand.remove(card)
             self._in_play.append(card)
+            if self.game.undo_stack.recording:
+                self.game.undo_stack.record(lambda: (self._in_play.pop(), self._hand.append(card)))
+            self.invalidate("hand")
             callback(card)
                     
 
@@ -512,8 +1180,21 @@ class CardGame(TurnBasedGame, ABC):
     def __init__(self):
         super().__init__()
         self.turn_phases: list[CardGame.TurnPhase] = [CardGame.TurnPhase.DRAW, CardGame.TurnPhase.PLAY]
-        self.current_phase: CardGame.TurnPhase = None
+        self.current_phase = None
         self.hand_limit: int = 4
+        self.deck: tuple[Card] = DECK_52
+        self.stock: list[Card] = []
+
+
+    def deal_hands(self, masks: Sequence[int], stock: Sequence[int] = ()) -> None:
+        """Sets the players' hands from Hand masks, in seating order, and the stock pile from card ids. \n
+        Used with the arrays of dealing.deal and dealing.hand_masks to set up many tables without
+        drawing card by card."""
+        for player, mask in zip(self.players, masks):
+            player._hand = Hand(mask=int(mask))
+            player.invalidate("hand")
+        
+        self.stock = [CARDS[i] for i in stock]
 
 
 class BoardGame(TurnBasedGame, ABC):
@@ -1,30 +1,140 @@
 from __future__ import annotations
+from array import array
+from collections import deque
+from heapq import heappush, heappop
+from itertools import count
+from types import MappingProxyType
+from typing import Any, Callable, Iterable, Iterator, Mapping, Sequence
+
+import json
+import mmap
+import struct
+import sys
+
 
 class WeightedDirectedMultiGraph:
     class Node:
+        __slots__ = ("value", "_id")
+        _ids = count()
+
+
         def __init__(self, value) -> None:
             self.value = value
 
 
-    def __init__(self) -> None:
+        @property
+        def id(self) -> int:
+            """Integer id, unique across graphs and stable for the node's lifetime. Assigned on first use."""
+            try:
+                return self._id
+            except AttributeError:
+                self._id = next(WeightedDirectedMultiGraph.Node._ids)
+                return self._id
+
+
+    directed = True
+    multigraph = True
+    weighted = True
+
+
+    def __init__(self, index_values: bool = False, acyclic: bool = False) -> None:
+        # forward (out) and reverse (in) adjacency. Both sides of an edge share one weight list,
+        # or a single weight in simple graphs. Undirected graphs keep a single map for both.
         self.graph: dict[self.Node, dict[self.Node, list[int]]] = {}
+        self.reverse_graph: dict[self.Node, dict[self.Node, list[int]]] = self.graph if not self.directed else {}
+
+        # value -> nodes holding that value. Built on first use unless index_values is set.
+        self.value_index: dict[Any, list[self.Node]] = {} if index_values else None
+
+        # acyclic graphs keep a topological position per node and reject edges that would close a cycle
+        if acyclic and not self.directed:
+            raise ValueError("Only directed graphs can be kept acyclic")
+        self.topological_index: dict[self.Node, int] = {} if acyclic else None
+        self._next_position = 0
+
+        # Copy-on-write. None while no adjacency is shared with another graph. After a union or copy, the nodes
+        # whose adjacency dicts this graph owns. All others are copied on first write, weight lists are replaced.
+        self._owned: set[self.Node] = None
 
     
-    def add_node(self, value) -> Node:
+    def add_node(self, value, unique: bool = False) -> Node:
+        """Adds a node holding value and returns it. \n
+        If unique is set and a node with an equal value exists, that node is returned instead."""
+        if unique:
+            nodes = self._get_value_index().get(value)
+            if nodes: return nodes[0]
+
         node = self.Node(value)
+        self._insert_node(node)
+        
+        return node
+    
 
+    def _insert_node(self, node: Node) -> None:
         if node not in self.graph:
             self.graph[node] = {}
+            if self.directed:
+                self.reverse_graph[node] = {}
+            if self.value_index is not None:
+                self.value_index.setdefault(node.value, []).append(node)
+            if self.topological_index is not None:
+                self.topological_index[node] = self._next_position
+                self._next_position += 1
+            if self._owned is not None:
+                self._owned.add(node)
+    
+
+    def _own(self, node: Node) -> None:
+        """Gives this graph private copies of node's adjacency dicts before they are changed"""
+        if node not in self._owned:
+            self.graph[node] = self.graph[node].copy()
+            if self.directed:
+                self.reverse_graph[node] = self.reverse_graph[node].copy()
+            self._owned.add(node)
+
+
+    def _get_value_index(self) -> dict[Any, list[Node]]:
+        if self.value_index is None:
+            self.value_index = {}
+            for node in self.graph:
+                self.value_index.setdefault(node.value, []).append(node)
         
-        return node
+        return self.value_index
+
+
+    def find_nodes(self, value) -> tuple[Node]:
+        """Returns all nodes holding value. Values must be hashable."""
+        return tuple(self._get_value_index().get(value, ()))
+    
+
+    def find_node(self, value) -> Node:
+        """Returns the first node added with value, or None"""
+        nodes = self._get_value_index().get(value)
+        return nodes[0] if nodes else None
     
 
     def remove_node(self, node: Node) -> None:
-        for edge, weights in self.graph[node].items():
-            for weight in weights:
-                self.remove_edge(node, edge, weight)
+        """Removes node and its incident edges in O(degree)"""
+        if self.value_index is not None:
+            nodes = self.value_index[node.value]
+            nodes.remove(node)
+            if not nodes:
+                del self.value_index[node.value]
+        if self.topological_index is not None:
+            del self.topological_index[node]
+        if self._owned is not None:
+            self._owned.discard(node)
+            for edge in (*self.graph[node], *self.reverse_graph[node]):
+                if edge is not node: self._own(edge)
+
+        for edge in self.graph.pop(node):
+            if edge is not node:
+                self.reverse_graph[edge].pop(node)
         
-        self.graph.pop(node)
+        if self.directed:
+            for edge in self.reverse_graph.pop(node):
+                if edge is not node:
+                    self.graph[edge].pop(node)
     
 
     def __delitem__(self, node: Node) -> None:
@@ -45,43 +155,184 @@ class WeightedDirectedMultiGraph:
     
 
     def __contains__(self, node: Node) -> bool:
-        for i in self.graph:
-            if i is node:
-                return True
-        
-        return False
+        return node in self.graph
     
 
     def __len__(self) -> int:
         return len(self.graph)
     
 
-    def __add__(self, other: Graph) -> Graph:
-        new_graph = Graph()
-        for node, edges in self.graph:
-            new_graph.graph[node] = edges
+    def union(self, *others: WeightedDirectedMultiGraph, edges: Iterable[tuple] = ()) -> WeightedDirectedMultiGraph:
+        """Returns a new graph with the nodes and edges of this graph and others, plus the stitching edges
+        (node1, node2, weight), or (node1, node2) for unweighted graphs. \n
+        Adjacency is shared with the sources and copied on first write by either side, so the cost is one
+        pass over the node maps plus the size of the changes made afterwards. Nodes present in several graphs
+        get their edges merged."""
+        graphs = (self, *others)
+        if any(graph.directed != self.directed for graph in others):
+            raise ValueError("Cannot merge directed and undirected graphs")
+
+        new_graph = type(self)(index_values=any(graph.value_index is not None for graph in graphs))
+        new_graph._owned = set()
+
+        for graph in graphs:
+            for node, out_edges in graph.graph.items():
+                if node in new_graph.graph:
+                    new_graph._own(node)
+                    new_graph._merge_edges(new_graph.graph[node], out_edges)
+                else:
+                    new_graph.graph[node] = out_edges
+            
+            if self.directed:
+                for node, in_edges in graph.reverse_graph.items():
+                    if node in new_graph._owned:
+                        new_graph._merge_edges(new_graph.reverse_graph[node], in_edges)
+                    else:
+                        new_graph.reverse_graph[node] = in_edges
+
+            # from now on the source must copy before writing too
+            graph._owned = set()
         
-        for node, edges in other.graph:
-            new_graph.graph[node] = edges
+        if new_graph.value_index is not None:
+            for node in new_graph.graph:
+                new_graph.value_index.setdefault(node.value, []).append(node)
         
+        if all(graph.topological_index is not None for graph in graphs):
+            new_graph.topological_index = {node: i for i, node in enumerate(new_graph.topological_order())}
+            new_graph._next_position = len(new_graph.topological_index)
+
+        new_graph.add_edges_from(edges)
         return new_graph
     
 
+    def _merge_edges(self, edges: dict[Node, list[int]], other: dict[Node, list[int]]) -> None:
+        for edge, weights in other.items():
+            if self.multigraph and edge in edges:
+                edges[edge] = edges[edge] + weights
+            else:
+                edges[edge] = weights
+
+
+    def __add__(self, other: WeightedDirectedMultiGraph) -> WeightedDirectedMultiGraph:
+        return self.union(other)
+    
+
+    def copy(self) -> WeightedDirectedMultiGraph:
+        """Copy-on-write copy of the graph, O(V) up front"""
+        return self.union()
+    
+
     def add_edge(self, node1: Node, node2: Node, weight: int) -> None:
-        self.add_node(node1)
-        self.add_node(node2)
+        self._insert_node(node1)
+        self._insert_node(node2)
+        if self._owned is not None:
+            self._own(node1)
+            self._own(node2)
 
-        if self.graph[node1][node2] is None:
-            self.graph[node1][node2] = [weight]
-            self.graph[node2][node1] = [-weight]
+        weights = self.graph[node1].get(node2)
+        if weights is None and self.topological_index is not None:
+            self._keep_order(node1, node2)
+
+        if not self.multigraph:
+            self.graph[node1][node2] = self.reverse_graph[node2][node1] = weight
+        elif weights is None or self._owned is not None:
+            self.graph[node1][node2] = self.reverse_graph[node2][node1] = (weights or []) + [weight]
         else:
-            self.graph[node1][node2].append(weight)
-            self.graph[node2][node1].append(-weight)
+            weights.append(weight)
+    
+
+    def add_nodes_from(self, values: Iterable) -> list[Node]:
+        nodes = [self.Node(value) for value in values]
+        for node in nodes:
+            self._insert_node(node)
+        
+        return nodes
+
+
+    def add_edges_from(self, edges: Iterable[tuple[Node, Node, int]]) -> None:
+        """Adds (node1, node2, weight) edges in one pass. Same result as calling add_edge for each."""
+        graph, reverse_graph, insert = self.graph, self.reverse_graph, self._insert_node
+        multigraph, acyclic, owned = self.multigraph, self.topological_index is not None, self._owned
+
+        for node1, node2, weight in edges:
+            if node1 not in graph: insert(node1)
+            if node2 not in graph: insert(node2)
+            if owned is not None:
+                if node1 not in owned: self._own(node1)
+                if node2 not in owned: self._own(node2)
+
+            out_edges = graph[node1]
+            if multigraph:
+                weights = out_edges.get(node2)
+                if weights is not None:
+                    if owned is None:
+                        weights.append(weight)
+                    else:
+                        out_edges[node2] = reverse_graph[node2][node1] = weights + [weight]
+                    continue
+            elif node1 is node2:
+                continue
+            
+            if acyclic and node2 not in out_edges:
+                self._keep_order(node1, node2)
+
+            out_edges[node2] = reverse_graph[node2][node1] = [weight] if multigraph else weight
+
+
+    @classmethod
+    def from_edge_list(cls, edges: Iterable[tuple], **kwargs) -> WeightedDirectedMultiGraph:
+        """Builds a graph from (value1, value2, weight) tuples, or (value1, value2) for unweighted graphs. \n
+        One node is created per distinct value."""
+        graph = cls(**kwargs)
+        nodes = {}
+
+        def node(value):
+            if value not in nodes:
+                nodes[value] = graph.add_node(value)
+            return nodes[value]
+
+        graph.add_edges_from((node(value1), node(value2), *weight) for value1, value2, *weight in edges)
+        return graph
     
 
+    @classmethod
+    def from_adjacency(cls, adjacency: Mapping, **kwargs) -> WeightedDirectedMultiGraph:
+        """Builds a graph from {value: {neighbour: weight}} for weighted graphs or {value: [neighbour, ...]}
+        for unweighted ones. A multigraph may give a list of weights per neighbour."""
+        graph = cls(**kwargs)
+        nodes = {value: graph.add_node(value) for value in adjacency}
+
+        def node(value):
+            if value not in nodes:
+                nodes[value] = graph.add_node(value)
+            return nodes[value]
+
+        def edges():
+            for value, neighbours in adjacency.items():
+                if not graph.weighted:
+                    for neighbour in neighbours:
+                        yield nodes[value], node(neighbour)
+                    continue
+
+                for neighbour, weights in neighbours.items():
+                    for weight in (weights if isinstance(weights, (list, tuple)) else (weights,)):
+                        yield nodes[value], node(neighbour), weight
+
+        graph.add_edges_from(edges())
+        return graph
+
+
     def remove_edge(self, node1: Node, node2: Node, weight: int) -> None:
-        self.graph[node1][node2].remove(weight)
-        self.graph[node2][node1].remove(-weight)
+        weights = self.graph[node1][node2]
+        if self._owned is not None:
+            self._own(node1)
+            self._own(node2)
+            weights = self.graph[node1][node2] = self.reverse_graph[node2][node1] = weights.copy()
+        weights.remove(weight)
+
+        if not weights:
+            self.graph[node1].pop(node2)
+            self.reverse_graph[node2].pop(node1, None)
 
     
     def find_edge(self, node1: Node, node2: Node, weight: int) -> bool:
@@ -91,83 +342,369 @@ class WeightedDirectedMultiGraph:
         return False
 
 
-    def get_edges(self, node: Node) -> dict[Node, list[int]]:
-        return self.graph[node]
+    def get_edges(self, node: Node) -> Mapping[Node, list[int]]:
+        return self.get_out_edges(node)
     
     
-    def __getitem__(self, node: Node) -> dict[Node, list[int]]:
+    def __getitem__(self, node: Node) -> Mapping[Node, list[int]]:
         return self.get_edges(node)
     
 
-    def get_in_edges(self, node: Node) -> dict[Node, list[int]]:
-        return {edge: weight for edge, weight in self.graph[node].items() if weight < 0}
+    def get_in_edges(self, node: Node) -> Mapping[Node, list[int]]:
+        """Read-only view of the edges ending at node, keyed by their source"""
+        return MappingProxyType(self.reverse_graph[node])
     
 
-    def get_out_edges(self, node: Node) -> dict[Node, list[int]]:
-        return {edge: weight for edge, weight in self.graph[node].items() if weight > 0}
+    def get_out_edges(self, node: Node) -> Mapping[Node, list[int]]:
+        """Read-only view of the edges starting at node, keyed by their target"""
+        return MappingProxyType(self.graph[node])
 
 
-    def dfs(self, func, node: Node = None) -> Node:  # TODO: add documentation
-        if len(self.graph) == 0: return
+    def _cheapest_edges(self, node: Node):
+        """Yields (neighbour, weight) pairs of the cheapest out edge to every neighbour of node"""
+        for edge, weights in self.graph[node].items():
+            yield edge, min(weights)
 
-        visited = set()
-        if node is None:
-            node = self.graph.keys()[0]
-        stack = [node]
 
-        while len(stack):
-            i = stack.pop()
-            if i not in visited:
-                res = func(i)
-                if res: return i
-                visited.add(i)
-                stack.extend(self.graph[i].keys() - visited)
+    def _out_weights(self, node: Node):
+        """Yields a (neighbour, weight) pair for every out edge of node, parallel edges included"""
+        for edge, weights in self.graph[node].items():
+            for weight in weights:
+                yield edge, weight
+
+
+    def dfs(self, func, node: Node = None) -> Node:
+        """Visits nodes depth first from node (default: the first node added) and returns the first one
+        for which func returns a truthy value, or None"""
+        for i in self.iter_dfs(node):
+            if func(i): return i
 
 
     def bfs(self, func, node: Node = None) -> Node:
+        """Visits nodes breadth first from node (default: the first node added) and returns the first one
+        for which func returns a truthy value, or None"""
+        for i in self.iter_bfs(node):
+            if func(i): return i
+
+
+    def iter_dfs(self, node: Node = None, max_depth: int = None, depth: bool = False) -> Iterator:
+        """Lazily yields nodes in depth first order, or (node, depth) pairs if depth is set. \n
+        Nodes further than max_depth edges along the search path are not expanded."""
         if len(self.graph) == 0: return
 
+        graph = self.graph
         visited = set()
-        if node is None:
-            node = self.graph.keys()[0]
-        queue = [node]
+        stack = [(next(iter(graph)) if node is None else node, 0)]
+
+        while stack:
+            node, level = stack.pop()
+            if node in visited: continue
+
+            visited.add(node)
+            yield (node, level) if depth else node
+
+            if max_depth is None or level < max_depth:
+                # reversed, so that the first neighbour is visited first
+                stack.extend((edge, level + 1) for edge in reversed(graph[node]) if edge not in visited)
+
+
+    def iter_bfs(self, node: Node = None, max_depth: int = None, depth: bool = False) -> Iterator:
+        """Lazily yields nodes in breadth first order, or (node, depth) pairs if depth is set. \n
+        Nodes further than max_depth edges from the start are not visited."""
+        if len(self.graph) == 0: return
+
+        graph = self.graph
+        node = next(iter(graph)) if node is None else node
+        visited = {node}
+        queue = deque(((node, 0),))
+
+        while queue:
+            node, level = queue.popleft()
+            yield (node, level) if depth else node
+
+            if max_depth is None or level < max_depth:
+                for edge in graph[node]:
+                    if edge not in visited:
+                        visited.add(edge)
+                        queue.append((edge, level + 1))
+
+
+    def iter_bfs_layers(self, node: Node = None, max_depth: int = None) -> Iterator[list[Node]]:
+        """Lazily yields lists of nodes exactly 0, 1, 2, ... edges away from node, up to max_depth"""
+        if len(self.graph) == 0: return
+
+        graph = self.graph
+        layer = [next(iter(graph)) if node is None else node]
+        visited = set(layer)
+        level = 0
+
+        while layer:
+            yield layer
+            if max_depth is not None and level >= max_depth: return
+
+            next_layer = []
+            for node in layer:
+                for edge in graph[node]:
+                    if edge not in visited:
+                        visited.add(edge)
+                        next_layer.append(edge)
+            
+            layer = next_layer
+            level += 1
+
+
+    def _keep_order(self, node1: Node, node2: Node) -> None:
+        """Pearce-Kelly dynamic topological sort. Updates topological_index for a new edge node1 -> node2
+        by reordering only the nodes between the two, or raises ValueError if the edge would close a cycle."""
+        order = self.topological_index
+        lower, upper = order[node2], order[node1]
+        if lower > upper: return
+
+        # nodes reachable from node2 that are placed before node1
+        forward, stack, seen = [], [node2], {node2}
+        while stack:
+            node = stack.pop()
+            forward.append(node)
+            for edge in self.graph[node]:
+                if edge is node1:
+                    raise ValueError("Edge would create a cycle")
+                if edge not in seen and order[edge] < upper:
+                    seen.add(edge)
+                    stack.append(edge)
+        
+        if node1 is node2:
+            raise ValueError("Edge would create a cycle")
+
+        # nodes reaching node1 that are placed after node2
+        backward, stack, seen = [], [node1], {node1}
+        while stack:
+            node = stack.pop()
+            backward.append(node)
+            for edge in self.reverse_graph[node]:
+                if edge not in seen and order[edge] > lower:
+                    seen.add(edge)
+                    stack.append(edge)
+        
+        # reuse the same positions, ancestors of node1 first
+        backward.sort(key=order.__getitem__)
+        forward.sort(key=order.__getitem__)
+        affected = backward + forward
+        for node, position in zip(affected, sorted(order[node] for node in affected)):
+            order[node] = position
+
+
+    def _kahn(self) -> list[Node]:
+        """Kahn's algorithm. Returns the nodes in topological order, leaving out every node on or after a cycle."""
+        in_degree = {node: len(edges) for node, edges in self.reverse_graph.items()}
+        ready = [node for node, degree in in_degree.items() if degree == 0]
+        order = []
+
+        while ready:
+            node = ready.pop()
+            order.append(node)
+            for edge in self.graph[node]:
+                in_degree[edge] -= 1
+                if in_degree[edge] == 0:
+                    ready.append(edge)
+        
+        return order
+
+
+    def topological_order(self) -> list[Node]:
+        """Returns the nodes ordered so that every edge points forward. Raises ValueError if the graph has a cycle."""
+        if self.topological_index is not None:
+            return sorted(self.topological_index, key=self.topological_index.__getitem__)
+
+        order = self._kahn()
+        if len(order) != len(self.graph):
+            raise ValueError("Graph has a cycle")
+        
+        return order
+
+
+    def has_cycle(self) -> bool:
+        if self.topological_index is not None: return False
+
+        return len(self._kahn()) != len(self.graph)
+
+
+    def strongly_connected_components(self) -> list[list[Node]]:
+        """Iterative Tarjan's algorithm in O(V + E). Components are listed sinks first (reverse topological order)."""
+        graph = self.graph
+        index: dict[Node, int] = {}
+        lowlink: dict[Node, int] = {}
+        stack, on_stack = [], set()
+        components = []
+
+        for root in graph:
+            if root in index: continue
+
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(graph[root]))]
+
+            while work:
+                node, edges = work[-1]
+                for edge in edges:
+                    if edge not in index:
+                        index[edge] = lowlink[edge] = len(index)
+                        stack.append(edge)
+                        on_stack.add(edge)
+                        work.append((edge, iter(graph[edge])))
+                        break
+                    if edge in on_stack and index[edge] < lowlink[node]:
+                        lowlink[node] = index[edge]
+                else:
+                    work.pop()
+                    if work and lowlink[node] < lowlink[work[-1][0]]:
+                        lowlink[work[-1][0]] = lowlink[node]
+
+                    if lowlink[node] == index[node]:
+                        component = []
+                        while True:
+                            edge = stack.pop()
+                            on_stack.discard(edge)
+                            component.append(edge)
+                            if edge is node: break
+                        components.append(component)
+        
+        return components
+
+
+    def _search(self, source: Node, target: Node = None, heuristic: Callable[[Node], int] = None) -> tuple[dict[Node, int], dict[Node, Node]]:
+        """Dijkstra's algorithm on a binary heap, or A* if a heuristic is given. \n
+        Stops as soon as target is settled. Returns distances and predecessors of settled nodes."""
+        distances: dict[Node, int] = {source: 0}
+        previous: dict[Node, Node] = {source: None}
+        settled: dict[Node, int] = {}
+        tie = count()  # nodes are not comparable, so equal priorities fall back on insertion order
+        heap = [(heuristic(source) if heuristic else 0, next(tie), 0, source)]
+
+        while heap:
+            _, _, distance, node = heappop(heap)
+            if node in settled: continue
+
+            settled[node] = distance
+            if node is target: break
+
+            for edge, weight in self._cheapest_edges(node):
+                if edge in settled: continue
+
+                new_distance = distance + weight
+                if edge not in distances or new_distance < distances[edge]:
+                    distances[edge] = new_distance
+                    previous[edge] = node
+                    priority = new_distance + heuristic(edge) if heuristic else new_distance
+                    heappush(heap, (priority, next(tie), new_distance, edge))
+        
+        return settled, previous
+
+
+    @staticmethod
+    def _build_path(previous: dict[Node, Node], target: Node) -> list[Node]:
+        path = []
+        while target is not None:
+            path.append(target)
+            target = previous[target]
+        
+        path.reverse()
+        return path
+
+
+    def shortest_path(self, source: Node, target: Node) -> list[Node]:
+        """Returns the cheapest path from source to target as a list of nodes, or None if target is unreachable. \n
+        Parallel edges are resolved to the cheapest one. Weights must not be negative."""
+        settled, previous = self._search(source, target)
+        if target not in settled: return None
+
+        return self._build_path(previous, target)
+    
 
-        while len(queue):
-            i = queue.pop(0)
-            if i not in visited:
-                res = func(i)
-                if res: return i
-                visited.add(i)
-                queue.extend(self.graph[i].keys() - visited)
+    def shortest_path_length(self, source: Node, target: Node) -> int:
+        """Returns the cost of the cheapest path from source to target, or None if target is unreachable"""
+        return self._search(source, target)[0].get(target)
 
-    # TODO: implement Djikstra, A* and other algorithms
+
+    def shortest_path_lengths(self, source: Node) -> dict[Node, int]:
+        """Returns the cost of the cheapest path from source to every reachable node"""
+        return self._search(source)[0]
+
+
+    def astar(self, source: Node, target: Node, heuristic: Callable[[Node], int]) -> list[Node]:
+        """A* search from source to target. Returns a list of nodes, or None if target is unreachable. \n
+        heuristic(node) estimates the remaining cost to target. It must be consistent: h(u) <= w(u, v) + h(v)
+        for every edge u -> v, and h(target) == 0. Settled nodes are never reopened, so a heuristic that is
+        merely admissible (never overestimates) can return a path that is not the shortest."""
+        settled, previous = self._search(source, target, heuristic)
+        if target not in settled: return None
+
+        return self._build_path(previous, target)
+
+
+    def freeze(self) -> FrozenGraph:
+        """Returns an immutable compressed sparse row snapshot of the graph"""
+        nodes = list(self.graph)
+        ids = {node: i for i, node in enumerate(nodes)}
+        offsets = array("q", [0])
+        targets = array("i" if len(nodes) < 2 ** 31 else "q")
+        weights = []
+
+        for node in nodes:
+            for edge, weight in self._out_weights(node):
+                targets.append(ids[edge])
+                weights.append(weight)
+            offsets.append(len(targets))
+        
+        weights = array("q" if all(isinstance(weight, int) for weight in weights) else "d", weights)
+
+        return FrozenGraph(nodes, offsets, targets, weights, ids, self.directed)
+
+
+    def save(self, path: str) -> None:
+        """Writes a frozen snapshot of the graph to path, see FrozenGraph.save"""
+        self.freeze().save(path)
 
 
 class UnweightedDirectedMultiGraph(WeightedDirectedMultiGraph):
+    weighted = False
+
+
     def add_edge(self, node1: WeightedDirectedMultiGraph.Node, node2: WeightedDirectedMultiGraph.Node) -> None:
         super().add_edge(node1, node2, 1)
     
 
+    def add_edges_from(self, edges: Iterable[tuple[WeightedDirectedMultiGraph.Node, WeightedDirectedMultiGraph.Node]]) -> None:
+        super().add_edges_from((node1, node2, 1) for node1, node2 in edges)
+    
+
     def remove_edge(self, node1: WeightedDirectedMultiGraph.Node, node2: WeightedDirectedMultiGraph.Node) -> None:
         return super().remove_edge(node1, node2, 1)
 
 
 class WeightedUndirectedMultiGraph(WeightedDirectedMultiGraph):
-    def add_edge(self, node1: WeightedDirectedMultiGraph.Node, node2: WeightedDirectedMultiGraph.Node, weight: int) -> None:
-        self.add_node(node1)
-        self.add_node(node2)
+    directed = False
 
-        if self.graph[node1][node2] is None:
-            self.graph[node1][node2] = [weight]
-            self.graph[node2][node1] = [weight]
-        else:
-            self.graph[node1][node2].append(weight)
-            self.graph[node2][node1].append(weight)
-    
 
-    def remove_edge(self, node1: WeightedDirectedMultiGraph.Node, node2: WeightedDirectedMultiGraph.Node, weight: int) -> None:
-        self.graph[node1][node2].remove(weight)
-        self.graph[node2][node1].remove(weight)
+    def has_cycle(self) -> bool:
+        """An undirected graph has a cycle if it has a loop, parallel edges or a second path between two nodes"""
+        seen = set()
+        for root in self.graph:
+            if root in seen: continue
+
+            seen.add(root)
+            stack = [(root, None)]
+            while stack:
+                node, parent = stack.pop()
+                for edge, weights in self.graph[node].items():
+                    if edge is node or self.multigraph and len(weights) > 1: return True
+                    if edge is parent: continue
+                    if edge in seen: return True
+
+                    seen.add(edge)
+                    stack.append((edge, node))
+        
+        return False
 
 
 class UnweightedUndirectedMultiGraph(UnweightedDirectedMultiGraph, WeightedUndirectedMultiGraph):
@@ -175,43 +712,51 @@ class UnweightedUndirectedMultiGraph(UnweightedDirectedMultiGraph, WeightedUndir
 
 
 class WeightedDirectedSimpleGraph(WeightedDirectedMultiGraph):
+    multigraph = False
+
+
     def add_edge(self, node1: WeightedDirectedMultiGraph.Node, node2: WeightedDirectedMultiGraph.Node, weight: int) -> None:
         if node1 is node2: return
-        self.graph[node1][node2] = []
         super().add_edge(node1, node2, weight)
+    
 
+    def remove_edge(self, node1: WeightedDirectedMultiGraph.Node, node2: WeightedDirectedMultiGraph.Node, weight: int) -> None:
+        if self.graph[node1].get(node2) != weight:
+            raise ValueError("Edge not found")
+        if self._owned is not None:
+            self._own(node1)
+            self._own(node2)
 
-    def has_cycle(self) -> bool:
-        if len(self.graph) == 0: return False
-
-        visited = set()
-        stack = [self.graph.keys()[0]]
+        self.graph[node1].pop(node2)
+        self.reverse_graph[node2].pop(node1, None)
+    
 
-        while len(stack):
-            node = stack.pop()
+    def find_edge(self, node1: WeightedDirectedMultiGraph.Node, node2: WeightedDirectedMultiGraph.Node, weight: int) -> bool:
+        return node2 in self.graph[node1] and self.graph[node1][node2] == weight
+    
 
-            if node in visited: return True
+    def _cheapest_edges(self, node: WeightedDirectedMultiGraph.Node):
+        return self.graph[node].items()
+    
 
-            stack.extend(self.graph[node].keys() - {node})
-            visited.add(node)
-            
-        return False
+    def _out_weights(self, node: WeightedDirectedMultiGraph.Node):
+        return self.graph[node].items()
 
 
 class WeightedUndirectedSimpleGraph(WeightedDirectedSimpleGraph, WeightedUndirectedMultiGraph):
     pass
 
 
-class UnweightedDirectedSimpleGraph(WeightedUndirectedSimpleGraph, UnweightedDirectedMultiGraph):
+class UnweightedDirectedSimpleGraph(UnweightedDirectedMultiGraph, WeightedDirectedSimpleGraph):
     pass
 
 
-class UnweightedUndirectedSimpleGraph(WeightedDirectedSimpleGraph, UnweightedUndirectedMultiGraph):
+class UnweightedUndirectedSimpleGraph(UnweightedUndirectedMultiGraph, WeightedUndirectedSimpleGraph):
     pass
 
 
 class MultiGraph(UnweightedDirectedMultiGraph):
-    """Unweighted directed simple graph"""
+    """Unweighted directed multigraph"""
 
 
 class UndirectedGraph(UnweightedUndirectedSimpleGraph):
@@ -224,3 +769,304 @@ class WeightedGraph(WeightedDirectedSimpleGraph):
 
 class Graph(UnweightedDirectedSimpleGraph):
     """Unweighted directed simple graph"""
+
+
+
+class FrozenGraph:
+    """Immutable compressed sparse row (CSR) snapshot of a graph, created by freeze(). \n
+    Nodes are numbered 0..n-1. Out edges of node i are targets[offsets[i]:offsets[i + 1]]
+    with matching weights, parallel edges stored one entry each."""
+    # magic, version, byte order, directed, targets typecode, weights typecode, node count, edge count, node table size
+    _HEADER = struct.Struct("<4sBBBcc7xQQQ")  # 40 bytes, so the sections that follow are 8 byte aligned
+    _MAGIC = b"PGCG"
+    _VERSION = 3
+
+
+    def __init__(self, nodes: list[WeightedDirectedMultiGraph.Node], offsets: Sequence[int], targets: Sequence[int], weights: Sequence[int], ids: dict[WeightedDirectedMultiGraph.Node, int] = None, directed: bool = True) -> None:
+        # offsets, targets and weights are arrays, or memoryviews of a mapped file after load()
+        self._nodes = nodes
+        self._ids = {node: i for i, node in enumerate(nodes)} if ids is None else ids
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.directed = directed
+        self._mmap = None
+
+
+    def save(self, path: str) -> None:
+        """Writes the snapshot in a binary format that load() maps into memory without parsing the edges. \n
+        Layout: header, offsets, targets, weights (each 8 byte aligned), then the node values as JSON.
+        Node values have to be None, bools, ints, floats, strings or tuples of them."""
+        values = [node.value for node in self._nodes]
+        for value in values:
+            FrozenGraph._check_value(value)
+        node_table = json.dumps(values, separators=(",", ":")).encode()
+        # arrays have a typecode, memoryviews of a loaded file a format
+        target_code = getattr(self.targets, "typecode", None) or self.targets.format
+        weight_code = getattr(self.weights, "typecode", None) or self.weights.format
+        header = self._HEADER.pack(self._MAGIC, self._VERSION, sys.byteorder == "little", self.directed, target_code.encode(),
+                                   weight_code.encode(), len(self._nodes), len(self.targets), len(node_table))
+
+        with open(path, "wb") as file:
+            file.write(header)
+            for section in (self.offsets, self.targets, self.weights):
+                data = section.tobytes()
+                file.write(data)
+                file.write(bytes(-len(data) % 8))
+            file.write(node_table)
+
+
+    @classmethod
+    def load(cls, path: str) -> FrozenGraph:
+        """Opens a file written by save(). The edge buffers stay in the memory mapped file, read-only,
+        so processes loading the same file share it through the page cache. Call close(), or use the
+        graph as a context manager, to unmap it. \n
+        Node values are read as JSON, so loading a file does not run code from it."""
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, little_endian, directed, target_code, weight_code, node_count, edge_count, table_size = cls._HEADER.unpack_from(mapped)
+        if magic != cls._MAGIC or version != cls._VERSION:
+            mapped.close()
+            raise ValueError(f"{path} is not a graph file of version {cls._VERSION}")
+
+        view = memoryview(mapped)
+        position = cls._HEADER.size
+        sections = []
+        for code, length in ((b"q", node_count + 1), (target_code, edge_count), (weight_code, edge_count)):
+            code = code.decode()
+            size = length * array(code).itemsize
+            section = view[position:position + size].cast(code)
+            if little_endian != (sys.byteorder == "little"):
+                # written on a machine of the other byte order, fall back to a swapped in-memory copy
+                section = array(code, section)
+                section.byteswap()
+            sections.append(section)
+            position += size + (-size % 8)
+        
+        values = json.loads(mapped[position:position + table_size])
+        graph = cls([WeightedDirectedMultiGraph.Node(FrozenGraph._tuples(value)) for value in values], *sections, directed=bool(directed))
+        graph._mmap = mapped
+        return graph
+
+
+    def close(self) -> None:
+        """Unmaps the file of a loaded graph. Its edges cannot be used afterwards, and views of
+        them taken from the graph have to be released first."""
+        if self._mmap is None: return
+        for section in (self.offsets, self.targets, self.weights):
+            if isinstance(section, memoryview):
+                section.release()
+        self._mmap.close()
+        self._mmap = None
+
+
+    def __enter__(self) -> FrozenGraph:
+        return self
+
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+    @staticmethod
+    def _check_value(value: Any) -> None:
+        if type(value) is tuple:
+            for item in value:
+                FrozenGraph._check_value(item)
+        elif value is not None and type(value) not in (bool, int, float, str):
+            raise TypeError(f"node value {value!r} cannot be saved, use None, bools, ints, floats, strings or tuples of them")
+
+
+    @staticmethod
+    def _tuples(value: Any) -> Any:
+        # JSON only has arrays, and saved node values only tuples
+        return tuple(map(FrozenGraph._tuples, value)) if type(value) is list else value
+
+
+    @property
+    def nodes(self) -> list[WeightedDirectedMultiGraph.Node]:
+        return self._nodes.copy()
+    
+
+    def __iter__(self):
+        return iter(self._nodes)
+    
+
+    def __contains__(self, node: WeightedDirectedMultiGraph.Node) -> bool:
+        return node in self._ids
+    
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+    
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets)
+
+
+    def index(self, node: WeightedDirectedMultiGraph.Node) -> int:
+        return self._ids[node]
+    
+
+    def node(self, index: int) -> WeightedDirectedMultiGraph.Node:
+        return self._nodes[index]
+
+
+    def out_degree(self, node: WeightedDirectedMultiGraph.Node) -> int:
+        i = self._ids[node]
+        return self.offsets[i + 1] - self.offsets[i]
+
+
+    def neighbours(self, node: WeightedDirectedMultiGraph.Node) -> list[WeightedDirectedMultiGraph.Node]:
+        """Targets of the out edges of node, repeated once per parallel edge"""
+        i = self._ids[node]
+        nodes = self._nodes
+        return [nodes[j] for j in self.targets[self.offsets[i]:self.offsets[i + 1]]]
+
+
+    def get_out_edges(self, node: WeightedDirectedMultiGraph.Node) -> dict[WeightedDirectedMultiGraph.Node, list[int]]:
+        i = self._ids[node]
+        start, end = self.offsets[i], self.offsets[i + 1]
+        edges = {}
+        for j, weight in zip(self.targets[start:end], self.weights[start:end]):
+            edges.setdefault(self._nodes[j], []).append(weight)
+        
+        return edges
+    
+
+    def get_edges(self, node: WeightedDirectedMultiGraph.Node) -> dict[WeightedDirectedMultiGraph.Node, list[int]]:
+        return self.get_out_edges(node)
+    
+
+    def __getitem__(self, node: WeightedDirectedMultiGraph.Node) -> dict[WeightedDirectedMultiGraph.Node, list[int]]:
+        return self.get_out_edges(node)
+
+
+    def find_edge(self, node1: WeightedDirectedMultiGraph.Node, node2: WeightedDirectedMultiGraph.Node, weight: int) -> bool:
+        i, j = self._ids[node1], self._ids.get(node2)
+        for k in range(self.offsets[i], self.offsets[i + 1]):
+            if self.targets[k] == j and self.weights[k] == weight:
+                return True
+        
+        return False
+
+
+    def dfs(self, func, node: WeightedDirectedMultiGraph.Node = None) -> WeightedDirectedMultiGraph.Node:
+        for i in self.iter_dfs(node):
+            if func(i): return i
+
+
+    def bfs(self, func, node: WeightedDirectedMultiGraph.Node = None) -> WeightedDirectedMultiGraph.Node:
+        for i in self.iter_bfs(node):
+            if func(i): return i
+
+
+    def iter_dfs(self, node: WeightedDirectedMultiGraph.Node = None, max_depth: int = None, depth: bool = False) -> Iterator:
+        if len(self._nodes) == 0: return
+
+        nodes, offsets, targets = self._nodes, self.offsets, self.targets
+        visited = bytearray(len(nodes))
+        stack = [(0 if node is None else self._ids[node], 0)]
+
+        while stack:
+            i, level = stack.pop()
+            if visited[i]: continue
+
+            visited[i] = 1
+            yield (nodes[i], level) if depth else nodes[i]
+
+            if max_depth is None or level < max_depth:
+                # reversed, so that the first neighbour is visited first
+                stack.extend((j, level + 1) for j in reversed(targets[offsets[i]:offsets[i + 1]]) if not visited[j])
+
+
+    def iter_bfs(self, node: WeightedDirectedMultiGraph.Node = None, max_depth: int = None, depth: bool = False) -> Iterator:
+        if len(self._nodes) == 0: return
+
+        nodes, offsets, targets = self._nodes, self.offsets, self.targets
+        start = 0 if node is None else self._ids[node]
+        visited = bytearray(len(nodes))
+        visited[start] = 1
+        queue = deque(((start, 0),))
+
+        while queue:
+            i, level = queue.popleft()
+            yield (nodes[i], level) if depth else nodes[i]
+
+            if max_depth is None or level < max_depth:
+                for j in targets[offsets[i]:offsets[i + 1]]:
+                    if not visited[j]:
+                        visited[j] = 1
+                        queue.append((j, level + 1))
+
+
+    def iter_dfs_indices(self, index: int = 0, max_depth: int = None) -> Iterator[int]:
+        """iter_dfs by node index (see index() and node()), without looking up Node objects"""
+        if len(self._nodes) == 0: return
+
+        offsets, targets = self.offsets, self.targets
+        visited = bytearray(len(self._nodes))
+        stack, levels = [index], [0]
+
+        while stack:
+            i, level = stack.pop(), levels.pop()
+            if visited[i]: continue
+
+            visited[i] = 1
+            yield i
+
+            if max_depth is None or level < max_depth:
+                # reversed, so that the first neighbour is visited first
+                children = [j for j in reversed(targets[offsets[i]:offsets[i + 1]]) if not visited[j]]
+                stack += children
+                levels += [level + 1] * len(children)
+
+
+    def iter_bfs_indices(self, index: int = 0, max_depth: int = None) -> Iterator[int]:
+        """iter_bfs by node index (see index() and node()), without looking up Node objects"""
+        if len(self._nodes) == 0: return
+
+        offsets, targets = self.offsets, self.targets
+        visited = bytearray(len(self._nodes))
+        visited[index] = 1
+        layer, level = [index], 0
+
+        while layer:
+            next_layer = []
+            expand = max_depth is None or level < max_depth
+            for i in layer:
+                yield i
+                if expand:
+                    for j in targets[offsets[i]:offsets[i + 1]]:
+                        if not visited[j]:
+                            visited[j] = 1
+                            next_layer.append(j)
+
+            layer = next_layer
+            level += 1
+
+
+    def iter_bfs_layers(self, node: WeightedDirectedMultiGraph.Node = None, max_depth: int = None) -> Iterator[list[WeightedDirectedMultiGraph.Node]]:
+        if len(self._nodes) == 0: return
+
+        nodes, offsets, targets = self._nodes, self.offsets, self.targets
+        layer = [0 if node is None else self._ids[node]]
+        visited = bytearray(len(nodes))
+        visited[layer[0]] = 1
+        level = 0
+
+        while layer:
+            yield [nodes[i] for i in layer]
+            if max_depth is not None and level >= max_depth: return
+
+            next_layer = []
+            for i in layer:
+                for j in targets[offsets[i]:offsets[i + 1]]:
+                    if not visited[j]:
+                        visited[j] = 1
+                        next_layer.append(j)
+            
+            layer = next_layer
+            level += 1
@@ -0,0 +1,194 @@
+from __future__ import annotations
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from math import log, sqrt
+
+from events import ActionPerformed
+from game import Bot, Game, TurnBasedGame
+
+import asyncio
+import pickle
+import random
+import time
+
+
+# Monte Carlo tree search over the game itself: every iteration tries a move with Game.checkpoint(),
+# plays the game to the end with Game._resume() and rolls it back. Game code therefore has to record
+# its changes on the undo stack (see undo.py) for the bot to see a consistent game. Between iterations
+# the game is back in its real state, and the search yields to the event loop there, so other tables
+# on a TableScheduler keep playing and Game.decision_timeout can cut a search short.
+#
+# The tree is open loop: nodes are sequences of choices (by any player), not game states, so dice and
+# shuffles are sampled anew on every visit. Choices inside the tree are made with UCT, beyond it at random.
+
+
+class _Node:
+    __slots__ = ("children", "visits", "reward")
+
+
+    def __init__(self) -> None:
+        self.children: dict[str, _Node] = {}
+        self.visits = 0
+        self.reward = 0.0  # summed results of the player who made the choice leading here
+
+
+class _Descent:
+    """Search policy for one iteration: UCT while in the tree, expands one node, then random choices"""
+    def __init__(self, root: _Node, exploration: float, rng: random.Random) -> None:
+        self.node = root
+        self.exploration = exploration
+        self.rng = rng
+        self.path: list[tuple[_Node, Game.Player]] = []
+
+
+    def __call__(self, player: Game.Player, options: Sequence[str]) -> str:
+        node = self.node
+        if node is None:
+            return self.rng.choice(options)
+
+        children = node.children
+        unvisited = [option for option in options if option not in children]
+        if unvisited:
+            option = self.rng.choice(unvisited)
+            child = children[option] = _Node()
+            self.node = None
+        else:
+            log_visits, exploration = log(node.visits), self.exploration
+            option = max(options, key=lambda option: children[option].reward / children[option].visits
+                         + exploration * sqrt(log_visits / children[option].visits))
+            child = self.node = children[option]
+
+        self.path.append((child, player))
+        return option
+
+
+class MCTSBot(Bot):
+    def __init__(self, name: str, game: Game, time_budget: float = 1.0, iterations: int = None,
+                 rollout_turns: int = 200, exploration: float = 1.4, workers: int = 0) -> None:
+        """Searches each decision for at most time_budget seconds and/or iterations iterations. \n
+        Rollouts still running after rollout_turns turns count as draws. \n
+        workers > 0 runs that many extra searches in other processes and merges their statistics
+        at the root (root parallelisation). Only used when the game can be pickled."""
+        super().__init__(name, game)
+        self.time_budget = time_budget
+        self.iterations = iterations
+        self.rollout_turns = rollout_turns
+        self.exploration = exploration
+        self.workers = workers
+        self._root: _Node = None  # subtree of the position reached, kept between decisions
+        self._executor: ProcessPoolExecutor = None
+        self.subscribe(ActionPerformed, self._follow)
+
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_root"] = state["_executor"] = None
+        return state
+
+
+    def _follow(self, event: ActionPerformed) -> None:
+        """Moves the kept tree along with the choices actually made at the table"""
+        if self.game.simulating or self._root is None: return
+        self._root = self._root.children.get(event.action.name)
+
+
+    async def _iterate(self, root: _Node, options: Sequence[str]) -> None:
+        game = self.game
+        descent = _Descent(root, self.exploration, self.rng)
+        mark = game.checkpoint()
+        # fresh dice for every rollout, and the table's generator exactly as it was afterwards
+        state = game.rng.getstate()
+        game.rng.seed(self.rng.getrandbits(64))
+        turn_limit = game.turn_limit
+        game.turn_limit = game.turn_count + self.rollout_turns if turn_limit is None else min(turn_limit, game.turn_count + self.rollout_turns)
+        game._policy = descent
+        try:
+            await game._resume(self, descent(self, options))
+            winners = list(game.winners) if game.is_game_over else []
+        finally:
+            game._policy = None
+            game.turn_limit = turn_limit
+            game.rollback(mark)
+            game.rng.setstate(state)
+
+        root.visits += 1
+        for node, player in descent.path:
+            node.visits += 1
+            node.reward += 0.5 if not winners else float(player in winners)
+
+
+    async def search(self, options: Sequence[str], time_budget: float = None, iterations: int = None, root: _Node = None) -> _Node:
+        """Runs UCT iterations from the current decision until the budget is spent and returns the root. \n
+        Every iteration restores the game and Game.rng, so searching does not change the game's dice.
+        Yields to the event loop after every iteration."""
+        deadline = time.perf_counter() + (self.time_budget if time_budget is None else time_budget)
+        iterations = self.iterations if iterations is None else iterations
+        root = _Node() if root is None else root
+
+        done = 0
+        while (iterations is None or done < iterations) and time.perf_counter() < deadline:
+            await self._iterate(root, options)
+            done += 1
+            await asyncio.sleep(0)
+
+        return root
+
+
+    async def choose_action(self, options: list[str]) -> str:
+        if not all(option in self.choices for option in options):
+            # a choice inside an action, e.g. which card to discard: rollouts can only start from an action
+            return self.rng.choice(options)
+
+        root = self._root if self._root is not None else _Node()
+        stats = {}
+
+        futures = self._start_workers(options)
+        root = await self.search(options, root=root)
+        for option in options:
+            child = root.children.get(option)
+            stats[option] = (child.visits, child.reward) if child else (0, 0.0)
+
+        for future in futures:
+            for option, (visits, reward) in (await future).items():
+                stats[option] = (stats[option][0] + visits, stats[option][1] + reward)
+
+        game = self.game
+        if isinstance(game, TurnBasedGame) and game.current_phase in game.simultaneous_phases:
+            # rollouts put this bot's choice first, but the table runs the choices in seating order
+            self._root = None
+        else:
+            self._root = root  # _follow moves it to the chosen child when the action is performed
+        return max(options, key=lambda option: stats[option])
+
+
+    def _start_workers(self, options: list[str]) -> list[asyncio.Future]:
+        if not self.workers: return []
+        try:
+            snapshot = pickle.dumps(self.game)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return []  # e.g. lambdas among the choices: search in this process only
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers)
+        loop = asyncio.get_running_loop()
+        # seeds from the bot's own generator, so that searching does not advance Game.rng
+        return [loop.run_in_executor(self._executor, _search_worker, snapshot, self.seat, options,
+                                     self.time_budget, self.iterations, self.rng.getrandbits(32))
+                for _ in range(self.workers)]
+
+
+    def close(self) -> None:
+        """Shuts down the worker processes, if any were started"""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+def _search_worker(snapshot: bytes, seat: int, options: list[str], time_budget: float, iterations: int, seed: int) -> dict[str, tuple[int, float]]:
+    """Searches an unpickled copy of the game and returns (visits, reward) of the root's children"""
+    game = pickle.loads(snapshot)
+    bot: MCTSBot = game.players[seat]
+    bot.rng.seed(seed)
+
+    root = asyncio.run(bot.search(options, time_budget, iterations))
+    return {option: (child.visits, child.reward) for option, child in root.children.items()}
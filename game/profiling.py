@@ -0,0 +1,133 @@
+from __future__ import annotations
+from array import array
+from collections.abc import Iterable
+
+
+# Opt-in instrumentation of a table: set game.profiler = Profiler() and the game records
+#   - how long every action's callback takes, per action name,
+#   - how often every predicate is evaluated, per action name,
+#   - how long players take to choose (choose_action, including waits for humans),
+#   - wall time per phase of TurnBasedGame.turn.
+# Without a profiler the game only checks game.profiler for None at each of those points.
+# Moves played ahead by search bots (Game.simulating) are not recorded.
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class Timing:
+    """Count and total of durations, with percentiles over the last window samples"""
+    __slots__ = ("count", "total", "_samples", "_window")
+
+
+    def __init__(self, window: int = 1000) -> None:
+        self.count = 0
+        self.total = 0.0
+        self._samples = array("d")
+        self._window = window
+
+
+    def add(self, seconds: float) -> None:
+        if len(self._samples) < self._window:
+            self._samples.append(seconds)
+        else:
+            self._samples[self.count % self._window] = seconds
+        self.count += 1
+        self.total += seconds
+
+
+    def percentile(self, fraction: float) -> float:
+        if not self._samples: return 0.0
+        samples = sorted(self._samples)
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+    def snapshot(self) -> dict:
+        return {"count": self.count, "total": self.total, "mean": self.total / self.count if self.count else 0.0,
+                **{f"p{round(q * 100)}": self.percentile(q) for q in QUANTILES}}
+
+
+class Profiler:
+    def __init__(self, table: str = "", window: int = 1000) -> None:
+        """table labels the exported metrics, window is the number of recent samples percentiles are taken from"""
+        self.table = table
+        self.window = window
+        self.actions: dict[str, Timing] = {}
+        self.predicates: dict[str, int] = {}
+        self.decisions = Timing(window)
+        self.phases: dict[str, Timing] = {}
+
+
+    def action(self, name: str, seconds: float) -> None:
+        timing = self.actions.get(name)
+        if timing is None:
+            timing = self.actions[name] = Timing(self.window)
+        timing.add(seconds)
+
+
+    def predicate(self, name: str) -> None:
+        self.predicates[name] = self.predicates.get(name, 0) + 1
+
+
+    def decision(self, seconds: float) -> None:
+        self.decisions.add(seconds)
+
+
+    def phase(self, phase, seconds: float) -> None:
+        name = getattr(phase, "name", str(phase))
+        timing = self.phases.get(name)
+        if timing is None:
+            timing = self.phases[name] = Timing(self.window)
+        timing.add(seconds)
+
+
+    def snapshot(self) -> dict:
+        """All metrics as plain dicts and numbers, e.g. for json.dumps"""
+        return {
+            "table": self.table,
+            "actions": {name: timing.snapshot() for name, timing in self.actions.items()},
+            "predicates": dict(self.predicates),
+            "decisions": self.decisions.snapshot(),
+            "phases": {name: timing.snapshot() for name, timing in self.phases.items()},
+        }
+
+
+    def to_prometheus(self) -> str:
+        return to_prometheus([self])
+
+
+def _labels(**labels) -> str:
+    def escape(value) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _summary(lines: list[str], metric: str, timing: Timing, **labels: str) -> None:
+    for q in QUANTILES:
+        lines.append(f"{metric}{_labels(**labels, quantile=q)} {timing.percentile(q)!r}")
+    lines.append(f"{metric}_sum{_labels(**labels)} {timing.total!r}")
+    lines.append(f"{metric}_count{_labels(**labels)} {timing.count}")
+
+
+def to_prometheus(profilers: Iterable[Profiler]) -> str:
+    """Prometheus text exposition of the metrics of many tables, labelled by table"""
+    profilers = list(profilers)
+    lines = ["# HELP game_action_seconds Time spent in action callbacks", "# TYPE game_action_seconds summary"]
+    for profiler in profilers:
+        for name, timing in profiler.actions.items():
+            _summary(lines, "game_action_seconds", timing, table=profiler.table, action=name)
+
+    lines += ["# HELP game_predicate_evaluations_total Legality checks of actions", "# TYPE game_predicate_evaluations_total counter"]
+    for profiler in profilers:
+        for name, count in profiler.predicates.items():
+            lines.append(f"game_predicate_evaluations_total{_labels(table=profiler.table, action=name)} {count}")
+
+    lines += ["# HELP game_decision_seconds Time players take to choose", "# TYPE game_decision_seconds summary"]
+    for profiler in profilers:
+        _summary(lines, "game_decision_seconds", profiler.decisions, table=profiler.table)
+
+    lines += ["# HELP game_phase_seconds Wall time of turn phases", "# TYPE game_phase_seconds summary"]
+    for profiler in profilers:
+        for name, timing in profiler.phases.items():
+            _summary(lines, "game_phase_seconds", timing, table=profiler.table, phase=name)
+
+    return "\n".join(lines) + "\n"
@@ -1,9 +1,14 @@
 from __future__ import annotations
 from collections.abc import Sequence
-from abc import abstractmethod
+from abc import ABC, abstractmethod
+from enum import Enum
 from typing import Callable, Any
+from random import shuffle
 
-class Program:
+from graph import Graph
+from statemachine import StateMachine
+
+class Program(ABC):
     # TODO: implement "state" functionality and event handlers
     # TODO: Add input streams (wasd, menu, mouse, ...)
     # TODO: input streams
@@ -79,23 +84,17 @@ class Program:
             return "Application.Player" + self.name
             
 
-    def __init__(self):
-        self.users: set[Program.User] = set(Program.User("admin"))
-        self.application_process = Graph()
+    class State(Enum):
+        START = 1
+        SETUP = 2
+        LOOP = 3
+        END = 4
 
-        self.current_state = self.application_process.add_node(Program.setup)
-        
 
-        self.process = [
-            {Program.State.START: self._start_program},
-            {
-                Program.State.SETUP: self.setup,
-                Program.State.LOOP: self._loop_wrapper
-            },
-            {}
-        ]
-
-        self.current_state = None
+    def __init__(self):
+        self.users: list[Program.User] = [Program.User("admin", self)]  # in turn order once set up
+        self.current_state: Program.State = None
+        self._is_game_over = False
 
     
     @property
@@ -105,18 +104,18 @@ class Program:
     
     def add_user(self, name: str) -> User:
         player = Program.User(name=name, game=self)
-        self.users.add(player)
+        self.users.append(player)
         return player
     
 
     def discard_user(self, player: User) -> User:
-        if isinstance(player, Program.User):
-            self.users.discard(player)
+        if isinstance(player, Program.User) and player in self.users:
+            self.users.remove(player)
 
 
     def add_bot(self, name: str) -> Bot:
         bot = Bot(name, self)
-        self.users.add(bot)
+        self.users.append(bot)
         return bot
     
 
@@ -137,19 +136,52 @@ class Program:
     @abstractmethod
     def loop(self) -> None:
         pass
+
+
+    @property
+    @abstractmethod
+    def is_game_over(self) -> bool:
+        """Checks the current state of the program. If it is over, set self.winners and self.losers"""
+        return self._is_game_over
     
 
     async def _loop_wrapper(self):
         while not self.is_game_over:
             for player in self.users:
-                player.use()
-            return self.loop()
+                await player.use()
+            self.loop()
+        
+        return Program.State.END
 
 
-    def _start_program(self):
-        """Run setup_game, run game loop asyncronously and return a tuple of winners and losers"""
-        self.setup()
+    @classmethod
+    def process(cls) -> StateMachine:
+        """States of the program, the transitions between them and their handlers, compiled once per class"""
+        application_process = Graph()
+        start, setup, loop, end = application_process.add_nodes_from(Program.State)
+        application_process.add_edges_from(((start, setup), (setup, loop), (loop, end)))
+
+        handlers = {
+            Program.State.START: cls._start_program,
+            Program.State.SETUP: cls.setup,
+            Program.State.LOOP: cls._loop_wrapper,
+            Program.State.END: lambda program: None,
+        }
+        return StateMachine(application_process, handlers, start=Program.State.START)
+
 
-        asyncio.run(self._loop_wrapper())
+    @classmethod
+    def state_machine(cls) -> StateMachine:
+        machine = cls.__dict__.get("_state_machine")
+        if machine is None:
+            machine = cls._state_machine = cls.process()
+        return machine
 
+
+    def _start_program(self):
         return Program.State.SETUP
+
+
+    async def run(self) -> None:
+        """Runs the program through its states on the running event loop"""
+        await self.state_machine().run(self)
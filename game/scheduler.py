@@ -0,0 +1,85 @@
+from __future__ import annotations
+from collections.abc import AsyncIterator, Iterable
+from typing import NamedTuple
+
+from game import Game
+
+import asyncio
+
+
+# Hosts many tables on one event loop, e.g. a server with thousands of games in progress.
+# Tables are run cooperatively: each yields to the loop after every turn, so a table waiting on
+# a human decision, or busy with bots, never stalls the others. Decisions are timed out per table
+# with Game.decision_timeout, after which the player's default_action is taken.
+
+
+class TableResult(NamedTuple):
+    game: Game
+    winners: list[Game.Player]
+    losers: list[Game.Player]
+    error: BaseException = None  # the table crashed, other tables carry on
+
+
+class TableScheduler:
+    def __init__(self, max_tables: int = None, decision_timeout: float = None) -> None:
+        """max_tables limits how many games are played at once (default: no limit), the rest wait their turn. \n
+        decision_timeout is applied to games that don't set their own."""
+        self.max_tables = max_tables
+        self.decision_timeout = decision_timeout
+        self.tables: set[asyncio.Task] = set()
+        self._slots: asyncio.Semaphore = None
+
+
+    @property
+    def table_count(self) -> int:
+        return len(self.tables)
+
+
+    async def _run_table(self, game: Game) -> TableResult:
+        if self._slots is None and self.max_tables is not None:
+            self._slots = asyncio.Semaphore(self.max_tables)
+
+        game.cooperative = True
+        if game.decision_timeout is None:
+            game.decision_timeout = self.decision_timeout
+
+        if self._slots is not None: await self._slots.acquire()
+        try:
+            winners, losers = await game.run()
+            return TableResult(game, winners, losers)
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            return TableResult(game, [], [], error)
+        finally:
+            if self._slots is not None: self._slots.release()
+
+
+    def submit(self, game: Game) -> asyncio.Task:
+        """Starts playing game on the running event loop. The task's result is a TableResult."""
+        task = asyncio.get_running_loop().create_task(self._run_table(game))
+        self.tables.add(task)
+        task.add_done_callback(self.tables.discard)
+        return task
+
+
+    async def play(self, games: Iterable[Game]) -> AsyncIterator[TableResult]:
+        """Plays all games concurrently and yields their results as they finish"""
+        for task in asyncio.as_completed([self.submit(game) for game in games]):
+            yield await task
+
+
+    async def shutdown(self) -> None:
+        """Cancels every table still in progress"""
+        for task in list(self.tables):
+            task.cancel()
+        await asyncio.gather(*self.tables, return_exceptions=True)
+
+
+def run_tables(games: Iterable[Game], max_tables: int = None, decision_timeout: float = None) -> list[TableResult]:
+    """Plays games concurrently on a new event loop and returns their results in the order given"""
+    async def main():
+        scheduler = TableScheduler(max_tables, decision_timeout)
+        return await asyncio.gather(*(scheduler.submit(game) for game in games))
+
+    return asyncio.run(main())
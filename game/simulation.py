@@ -0,0 +1,98 @@
+from __future__ import annotations
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import NamedTuple
+
+from game import Game
+
+import asyncio
+import os
+import random
+
+
+# Headless batch runner for balance testing. Games are played by bots only, in batches,
+# across a process pool. Every game is seeded with seed + index, so any single game
+# can be reproduced with play_game() regardless of which worker played it.
+
+
+class GameResult(NamedTuple):
+    index: int
+    seed: int
+    winners: tuple[int, ...]  # seat numbers
+    losers: tuple[int, ...]
+    turns: int
+
+
+_loop: asyncio.AbstractEventLoop = None
+
+
+def _event_loop() -> asyncio.AbstractEventLoop:
+    """One event loop per process, reused by every game instead of asyncio.run per game"""
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+    return _loop
+
+
+def play_game(game: type[Game], seats: Sequence[Callable[[str, Game], Game.Player]], seed: int, index: int = 0, turn_limit: int = None) -> GameResult:
+    """Plays one game between the players created by seats, seeding the random module with seed"""
+    random.seed(seed)
+    table = game()
+    table.turn_limit = turn_limit
+    players = [table.add_player(seat(f"Seat {i}", table)) for i, seat in enumerate(seats)]
+    seat_of = {id(player): i for i, player in enumerate(players)}
+
+    winners, losers = _event_loop().run_until_complete(table.run())
+
+    return GameResult(index, seed, tuple(seat_of[id(player)] for player in winners),
+                      tuple(seat_of[id(player)] for player in losers), table.turn_count)
+
+
+def _play_batch(game: type[Game], seats: Sequence[Callable], seed: int, start: int, stop: int, turn_limit: int) -> list[GameResult]:
+    return [play_game(game, seats, seed + index, index, turn_limit) for index in range(start, stop)]
+
+
+def simulate(game: type[Game], seats: Sequence[Callable[[str, Game], Game.Player]], games: int, workers: int = None,
+             seed: int = None, batch_size: int = 500, turn_limit: int = None) -> Iterator[GameResult]:
+    """Plays games bot-only games of the given Game subclass and yields a GameResult for each as batches finish. \n
+    seats are picklable player factories, e.g. bot classes, called as seat(name, game) once per game. \n
+    workers is the number of processes (default: one per CPU), 0 plays in this process.
+    Games that reach turn_limit end without winners."""
+    seed = random.randrange(2 ** 32) if seed is None else seed
+    batches = [(start, min(start + batch_size, games)) for start in range(0, games, batch_size)]
+
+    if workers == 0:
+        for start, stop in batches:
+            yield from _play_batch(game, seats, seed, start, stop, turn_limit)
+        return
+
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # a few batches in flight per worker, so memory stays flat however many games are requested
+        pending = set()
+        batches = iter(batches)
+        while True:
+            for start, stop in batches:
+                pending.add(executor.submit(_play_batch, game, seats, seed, start, stop, turn_limit))
+                if len(pending) >= 2 * workers: break
+
+            if not pending: return
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+
+
+def summarize(results: Iterator[GameResult], seat_count: int) -> dict:
+    """Win counts per seat, draws and mean game length of a stream of results"""
+    games = turns = draws = 0
+    wins = [0] * seat_count
+
+    for result in results:
+        games += 1
+        turns += result.turns
+        draws += not result.winners
+        for seat in result.winners:
+            wins[seat] += 1
+
+    return {"games": games, "wins": wins, "draws": draws, "mean_turns": turns / games if games else 0}
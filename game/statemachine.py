@@ -0,0 +1,88 @@
+from __future__ import annotations
+from collections.abc import Callable, Mapping
+from enum import Enum
+from inspect import isawaitable
+from typing import Any
+
+from graph import WeightedDirectedMultiGraph
+
+
+# Drives Program and Game through their states. The process graph (node values are states, edges
+# are the allowed transitions) and the state handlers are checked once, then compiled into tables
+# indexed by the states' integer values, so stepping from one state to the next is a list lookup.
+# A handler takes the program and returns the next state, or None to stop. Handlers may be coroutines.
+
+
+class StateMachine:
+    def __init__(self, graph: WeightedDirectedMultiGraph, handlers: Mapping[Enum, Callable[[Any], Any]], start: Enum,
+                 on_enter: Mapping[Enum, Callable[[Any], Any]] = None, on_exit: Mapping[Enum, Callable[[Any], Any]] = None) -> None:
+        """on_enter and on_exit hooks are called with the program before and after a state's handler"""
+        states = [node.value for node in graph.nodes]
+        self._validate(states, handlers, start, on_enter or {}, on_exit or {})
+
+        size = max(state.value for state in states) + 1
+        self.states: list[Enum] = [None] * size
+        self.handlers: list[Callable] = [None] * size
+        self.on_enter: list[Callable] = [None] * size
+        self.on_exit: list[Callable] = [None] * size
+        self.transitions: list[int] = [0] * size  # bitmask of the states reachable in one step
+        self.start = start.value
+
+        for node in graph.nodes:
+            i = node.value.value
+            self.states[i] = node.value
+            self.handlers[i] = handlers[node.value]
+            self.on_enter[i] = (on_enter or {}).get(node.value)
+            self.on_exit[i] = (on_exit or {}).get(node.value)
+            for target in graph.get_out_edges(node):
+                self.transitions[i] |= 1 << target.value.value
+
+
+    @staticmethod
+    def _validate(states: list[Enum], handlers: Mapping, start: Enum, on_enter: Mapping, on_exit: Mapping) -> None:
+        if len({type(state) for state in states}) != 1:
+            raise ValueError("The states of a process must be members of a single Enum")
+        if not all(isinstance(state.value, int) and state.value >= 0 for state in states):
+            raise ValueError("States need non-negative int values to be compiled")
+        if len(states) != len(set(states)):
+            raise ValueError("Every state may appear only once in the process graph")
+        if start not in states:
+            raise ValueError(f"Start state {start} is not in the process graph")
+
+        for name, mapping in (("handler", handlers), ("on_enter hook", on_enter), ("on_exit hook", on_exit)):
+            unknown = set(mapping) - set(states)
+            if unknown:
+                raise ValueError(f"{name} given for states not in the process graph: {unknown}")
+        missing = set(states) - set(handlers)
+        if missing:
+            raise ValueError(f"No handler for states {missing}")
+
+
+    async def run(self, program: Any, state: Enum = None) -> None:
+        """Steps program through its states from start (or state) until a handler returns None. \n
+        Keeps program.current_state up to date. Raises RuntimeError on a transition missing from the graph."""
+        states, handlers, transitions = self.states, self.handlers, self.transitions
+        on_enter, on_exit = self.on_enter, self.on_exit
+        current = self.start if state is None else state.value
+
+        while True:
+            program.current_state = states[current]
+            if on_enter[current] is not None: await _call(on_enter[current], program)
+
+            result = handlers[current](program)
+            if isawaitable(result):
+                result = await result
+
+            if on_exit[current] is not None: await _call(on_exit[current], program)
+            if result is None: return
+
+            following = result.value
+            if not transitions[current] >> following & 1:
+                raise RuntimeError(f"No transition from {states[current]} to {result}")
+            current = following
+
+
+async def _call(hook: Callable, program: Any) -> None:
+    result = hook(program)
+    if isawaitable(result):
+        await result
@@ -0,0 +1,146 @@
+from __future__ import annotations
+from array import array
+from collections.abc import Iterator, Sequence
+from typing import Any
+
+
+# Seating of a turn based game as a ring of seat numbers: _left[seat] is the next seat clockwise,
+# _right[seat] the next one counterclockwise. Removing a seat links its neighbours to each other and
+# keeps the seat's own links, so the turn can still pass on from a player removed during their turn,
+# and restore() can put seats back in the reverse order they were removed (as undo does).
+
+
+class TurnOrder:
+    def __init__(self, players: Sequence[Any], clockwise: bool = True) -> None:
+        """Seats players in the given order, clockwise. The first player has the turn."""
+        count = len(players)
+        if not count:
+            raise ValueError("A turn order needs at least one player")
+
+        self.players = list(players)  # seat: player, including removed players
+        self._seats = {player: seat for seat, player in enumerate(self.players)}
+        self._left = array("l", range(1, count + 1))
+        self._right = array("l", range(-1, count - 1))
+        self._left[-1], self._right[0] = 0, count - 1
+        self._removed = bytearray(count)
+        self._active = count
+
+        self.current = 0  # seat that has the turn
+        self.clockwise = clockwise
+        self.turns = 0  # turns passed on
+        self.rounds = 0  # completed rounds, i.e. times the turn came back to the round's first seat
+        self._round_start = 0
+
+
+    def __len__(self) -> int:
+        """Number of players still seated"""
+        return self._active
+
+
+    def __contains__(self, player: Any) -> bool:
+        seat = self._seats.get(player)
+        return seat is not None and not self._removed[seat]
+
+
+    def __iter__(self) -> Iterator[Any]:
+        """Seated players in turn order, starting with the player who has the turn"""
+        seat = self.current if not self._removed[self.current] else self._step(self.current)
+        for _ in range(self._active):
+            yield self.players[seat]
+            seat = self._step(seat)
+
+
+    @property
+    def current_player(self) -> Any:
+        return self.players[self.current]
+
+
+    @property
+    def position(self) -> tuple[int, int, int, bool, int]:
+        """The counters and direction, to be restored by assignment (e.g. by undo)"""
+        return self.current, self.turns, self.rounds, self.clockwise, self._round_start
+
+
+    @position.setter
+    def position(self, position: tuple[int, int, int, bool, int]) -> None:
+        self.current, self.turns, self.rounds, self.clockwise, self._round_start = position
+
+
+    def _follow(self, links: array, seat: int) -> int:
+        # links of removed seats can be stale, but always lead back into the ring
+        seat, removed = links[seat], self._removed
+        while removed[seat]:
+            seat = links[seat]
+        return seat
+
+
+    def _step(self, seat: int) -> int:
+        return self._follow(self._left if self.clockwise else self._right, seat)
+
+
+    def next(self, player: Any = None) -> Any:
+        """Player who plays after player (default: the current player) in the current direction"""
+        return self.players[self._step(self.current if player is None else self._seats[player])]
+
+
+    def previous(self, player: Any = None) -> Any:
+        """Player who played before player (default: the current player) in the current direction"""
+        links = self._right if self.clockwise else self._left
+        return self.players[self._follow(links, self.current if player is None else self._seats[player])]
+
+
+    def left_of(self, player: Any) -> Any:
+        return self.players[self._follow(self._left, self._seats[player])]
+
+
+    def right_of(self, player: Any) -> Any:
+        return self.players[self._follow(self._right, self._seats[player])]
+
+
+    def advance(self) -> Any:
+        """Passes the turn to the next player and returns them"""
+        start_removed = self._removed[self._round_start]
+        self.current = self._step(self.current)
+        self.turns += 1
+        if start_removed:
+            # the round's first seat was removed during its own turn: the round now starts here
+            self._round_start = self.current
+        elif self.current == self._round_start:
+            self.rounds += 1
+        return self.players[self.current]
+
+
+    def reverse(self) -> None:
+        """Reverses the direction of play. The round in progress is abandoned: a new one starts at the current seat."""
+        self.clockwise = not self.clockwise
+        self._round_start = self.current
+
+
+    def remove(self, player: Any) -> None:
+        """Takes player's seat out of the ring. The turn passes on from them as usual if they have it."""
+        seat = self._seats[player]
+        if self._removed[seat]:
+            raise ValueError(f"{player} is not seated")
+        if self._active == 1:
+            raise ValueError("Cannot remove the last player")
+
+        left, right = self._left, self._right
+        right[left[seat]] = right[seat]
+        left[right[seat]] = left[seat]
+        self._removed[seat] = 1
+        self._active -= 1
+        if seat == self._round_start and seat != self.current:
+            self._round_start = self._step(seat)
+
+
+    def restore(self, player: Any) -> None:
+        """Seats a removed player again. Seats must be restored in the reverse order of their removal."""
+        seat = self._seats[player]
+        if not self._removed[seat]:
+            raise ValueError(f"{player} is seated")
+
+        left, right = self._left, self._right
+        right[left[seat]] = seat
+        left[right[seat]] = seat
+        self._removed[seat] = 0
+        self._active += 1
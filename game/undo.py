@@ -0,0 +1,94 @@
+from __future__ import annotations
+from collections.abc import Callable
+from typing import Any
+
+
+# Make/unmake support for lookahead: instead of copying a game to try a move on, changes are
+# recorded as small undo functions and reverted in reverse order. Nothing is recorded unless
+# the stack is enabled or a checkpoint is open, so games that never look ahead only pay
+# for a flag check per change.
+#
+# Game code records its changes through Game.undo_stack: setattr() for attributes, or
+# record() with a function restoring anything else (list appends, graph edits, ...).
+
+
+class UndoStack:
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled  # record every action, so that undo() works without a checkpoint
+        self._changes: list[Callable[[], None]] = []
+        self._frames: list[int] = []  # len(_changes) when each recorded action started
+        self._checkpoints = 0
+
+
+    @property
+    def recording(self) -> bool:
+        return self.enabled or self._checkpoints > 0
+
+
+    def __len__(self) -> int:
+        """Number of recorded actions that undo() can revert"""
+        return len(self._frames)
+
+
+    def record(self, undo: Callable[[], None]) -> None:
+        """Registers a function that reverts a change that was just made"""
+        if self.enabled or self._checkpoints:
+            self._changes.append(undo)
+
+
+    def setattr(self, obj: Any, name: str, value: Any) -> None:
+        """setattr(obj, name, value) that can be reverted"""
+        if self.enabled or self._checkpoints:
+            old = getattr(obj, name)
+            self._changes.append(lambda: setattr(obj, name, old))
+        setattr(obj, name, value)
+
+
+    def begin_action(self) -> None:
+        """Starts a new frame for undo(), called by Action.run"""
+        if self.enabled or self._checkpoints:
+            self._frames.append(len(self._changes))
+
+
+    def _revert(self, size: int) -> None:
+        # undo functions may go through recording code (setters, invalidate), which must not record again
+        changes, enabled, checkpoints = self._changes, self.enabled, self._checkpoints
+        self.enabled, self._checkpoints = False, 0
+        try:
+            while len(changes) > size:
+                changes.pop()()
+        finally:
+            self.enabled, self._checkpoints = enabled, checkpoints
+
+
+    def undo(self) -> None:
+        """Reverts the last recorded action, including what happened after it until now"""
+        if not self._frames:
+            raise IndexError("Nothing to undo")
+        self._revert(self._frames.pop())
+
+
+    def checkpoint(self) -> tuple[int, int]:
+        """Starts recording, if needed, and returns a mark to pass to rollback() or release()"""
+        self._checkpoints += 1
+        return len(self._changes), len(self._frames)
+
+
+    def rollback(self, mark: tuple[int, int]) -> None:
+        """Restores the state at checkpoint mark and closes it. Time is proportional to the changes since."""
+        changes, frames = mark
+        self._revert(changes)
+        del self._frames[frames:]
+        self.release(mark)
+
+
+    def release(self, mark: tuple[int, int]) -> None:
+        """Closes checkpoint mark, keeping the changes made since"""
+        self._checkpoints -= 1
+        if not self.recording:
+            self.clear()
+
+
+    def clear(self) -> None:
+        self._changes.clear()
+        self._frames.clear()
@@ -0,0 +1,125 @@
+from __future__ import annotations
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "game"))
+
+import actionlog
+from scheduler import run_tables
+from game import ChaoticBot, Dice, TurnBasedGame
+
+
+class DiceRace(TurnBasedGame):
+    """Roll one die or two and move that far; rolling a 1 sends you back to the start"""
+    class Player(TurnBasedGame.Player):
+        def __init__(self, name: str, game: DiceRace) -> None:
+            super().__init__(name, game)
+            self.position = 0
+            self.add_choice("Roll one", lambda player: True, lambda player: player.move(1), depends=())
+            self.add_choice("Roll two", lambda player: player.position < 30, lambda player: player.move(2), depends=("position",))
+
+
+        def move(self, dice: int) -> None:
+            rolls = self.game.dice.roll(dice, self.game.rng)
+            self.game.undo_stack.setattr(self, "position", 0 if 1 in rolls else self.position + sum(rolls))
+            self.invalidate("position")
+
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.turn_phases = [TurnBasedGame.TurnPhase.PLAY]
+        self.dice = Dice()
+
+
+    @property
+    def is_game_over(self) -> bool:
+        for player in self.players:
+            if player.position >= 40:
+                self.winners, self.losers = [player], [other for other in self.players if other is not player]
+                return True
+        return False
+
+
+    def setup(self) -> None:
+        super().setup()
+
+
+    def loop(self) -> None:
+        super().loop()
+
+
+class DiceRaceBot(ChaoticBot, DiceRace.Player): pass
+
+
+def new_game() -> DiceRace:
+    game = DiceRace()
+    for seat in range(3):
+        game.add_player(DiceRaceBot(f"Seat {seat}", game))
+    return game
+
+
+def outcome(game: DiceRace) -> tuple:
+    return [(player.name, player.position) for player in game.players], game.turn_count, [player.name for player in game.winners]
+
+
+class ReplayTest(unittest.TestCase):
+    def setUp(self) -> None:
+        handle, self.path = tempfile.mkstemp(suffix=".log")
+        os.close(handle)
+        os.remove(self.path)
+
+
+    def tearDown(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+    def test_replay_reproduces_games_of_random_bots(self) -> None:
+        random.seed(0)
+        recorded = []
+        with actionlog.ActionLog(self.path) as log:
+            for _ in range(10):
+                game = new_game()
+                game.action_log = log
+                asyncio.run(game.run())
+                recorded.append(outcome(game))
+
+        records = list(actionlog.games(actionlog.read(self.path)))
+        self.assertEqual(len(records), len(recorded))
+        for record, expected in zip(records, recorded):
+            self.assertEqual(record.turns, expected[1])
+            self.assertEqual(outcome(asyncio.run(actionlog.replay(new_game, record))), expected)
+
+
+    def test_replay_tables_interleaved_by_a_scheduler(self) -> None:
+        random.seed(2)
+        tables = [new_game() for _ in range(4)]
+        with actionlog.ActionLog(self.path) as log:
+            for game in tables:
+                game.action_log = log
+            results = run_tables(tables)
+
+        self.assertTrue(all(result.error is None for result in results))
+        records = list(actionlog.games(actionlog.read(self.path)))
+        replayed = [outcome(asyncio.run(actionlog.replay(new_game, record))) for record in records]
+        self.assertEqual(sorted(replayed), sorted(outcome(game) for game in tables))
+
+
+    def test_replay_stops_at_turn(self) -> None:
+        random.seed(1)
+        with actionlog.ActionLog(self.path) as log:
+            game = new_game()
+            game.action_log = log
+            asyncio.run(game.run())
+
+        record = next(actionlog.games(actionlog.read(self.path)))
+        game = asyncio.run(actionlog.replay(new_game, record, turn=5))
+        self.assertEqual(game.turn_count, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,263 @@
+from __future__ import annotations
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "game"))
+
+from graph import FrozenGraph, Graph, MultiGraph, UndirectedGraph, WeightedGraph
+
+
+def random_graph(rng: random.Random, size: int, edges: int, cls: type = Graph) -> tuple:
+    """A graph with size nodes and up to edges random (node1, node2) pairs to add, without loops,
+    which simple graphs ignore"""
+    graph = cls()
+    nodes = graph.add_nodes_from(range(size))
+    pairs = [(u, v) for u, v in ((rng.choice(nodes), rng.choice(nodes)) for _ in range(edges)) if u is not v]
+    return graph, nodes, pairs
+
+
+def reachable(graph, source) -> set:
+    """Nodes reachable from source by a path of at least one edge, by plain search"""
+    seen, stack = set(), list(graph.graph[source])
+    while stack:
+        node = stack.pop()
+        if node not in seen:
+            seen.add(node)
+            stack.extend(graph.graph[node])
+    return seen
+
+
+class CycleTest(unittest.TestCase):
+    """Cycles, components and orders of random graphs against brute-force reachability"""
+    def setUp(self) -> None:
+        self.rng = random.Random(8)
+
+
+    def test_strongly_connected_components(self) -> None:
+        for _ in range(50):
+            graph, nodes, pairs = random_graph(self.rng, 12, self.rng.randrange(30))
+            graph.add_edges_from(pairs)
+            reach = {node: reachable(graph, node) for node in nodes}
+            components = graph.strongly_connected_components()
+            component = {node: i for i, members in enumerate(components) for node in members}
+
+            self.assertEqual(sorted(node.value for members in components for node in members), list(range(12)))
+            for u in nodes:
+                for v in nodes:
+                    if u is not v:
+                        self.assertEqual(component[u] == component[v], v in reach[u] and u in reach[v])
+            # sinks first
+            for u, v in pairs:
+                self.assertLessEqual(component[v], component[u])
+
+
+    def test_has_cycle_and_topological_order(self) -> None:
+        for _ in range(50):
+            graph, nodes, pairs = random_graph(self.rng, 10, self.rng.randrange(20))
+            graph.add_edges_from(pairs)
+            cyclic = any(node in reachable(graph, node) for node in nodes)
+
+            self.assertEqual(graph.has_cycle(), cyclic)
+            if cyclic:
+                with self.assertRaises(ValueError):
+                    graph.topological_order()
+            else:
+                position = {node: i for i, node in enumerate(graph.topological_order())}
+                self.assertEqual(len(position), len(nodes))
+                self.assertTrue(all(position[u] < position[v] for u, v in pairs))
+
+
+    def test_diamond_is_not_a_cycle(self) -> None:
+        graph = Graph()
+        a, b, c, d = graph.add_nodes_from("abcd")
+        graph.add_edges_from([(a, b), (a, c), (b, d), (c, d)])
+        self.assertFalse(graph.has_cycle())
+
+
+    def test_acyclic_graph_rejects_exactly_the_closing_edges(self) -> None:
+        for _ in range(30):
+            graph, nodes, pairs = random_graph(self.rng, 12, 40, lambda: Graph(acyclic=True))
+            added = []
+            for u, v in pairs:
+                closes = u in reachable(graph, v)
+                if closes:
+                    with self.assertRaises(ValueError):
+                        graph.add_edge(u, v)
+                else:
+                    graph.add_edge(u, v)
+                    added.append((u, v))
+
+                index = graph.topological_index
+                self.assertTrue(all(index[a] < index[b] for a, b in added))
+
+            self.assertFalse(graph.has_cycle())
+            position = {node: i for i, node in enumerate(graph.topological_order())}
+            self.assertTrue(all(position[a] < position[b] for a, b in added))
+
+
+    def test_loops(self) -> None:
+        graph = MultiGraph()
+        a, b = graph.add_nodes_from("ab")
+        graph.add_edge(a, b)
+        self.assertFalse(graph.has_cycle())
+        graph.add_edge(b, b)
+        self.assertTrue(graph.has_cycle())
+
+        graph = MultiGraph(acyclic=True)
+        a, = graph.add_nodes_from("a")
+        with self.assertRaises(ValueError):
+            graph.add_edge(a, a)
+
+
+    def test_acyclic_add_edges_from(self) -> None:
+        graph = Graph(acyclic=True)
+        a, b, c = graph.add_nodes_from("abc")
+        graph.add_edges_from([(c, b), (b, a)])
+        with self.assertRaises(ValueError):
+            graph.add_edges_from([(a, c)])
+        self.assertEqual(graph.topological_order(), [c, b, a])
+
+
+    def test_undirected_has_cycle(self) -> None:
+        for _ in range(50):
+            graph, nodes, pairs = random_graph(self.rng, 10, self.rng.randrange(12), UndirectedGraph)
+            graph.add_edges_from(pairs)
+            # a simple undirected graph is a forest iff edges == nodes - components
+            edges = {frozenset((u, v)) for u, v in pairs}
+            components, seen = 0, set()
+            for node in nodes:
+                if node not in seen:
+                    components += 1
+                    seen |= reachable(graph, node) | {node}
+            forest = len(edges) == len(nodes) - components
+            self.assertEqual(graph.has_cycle(), not forest)
+
+
+def edges(graph) -> list:
+    """The graph's edges as sorted (value1, value2, weights) triples, in both directions for undirected graphs"""
+    forward = sorted((u.value, v.value, repr(weights)) for u, out_edges in graph.graph.items() for v, weights in out_edges.items())
+    if graph.directed:
+        backward = sorted((u.value, v.value, repr(weights)) for v, in_edges in graph.reverse_graph.items() for u, weights in in_edges.items())
+        assert forward == backward, "forward and reverse adjacency disagree"
+    return forward
+
+
+class UnionTest(unittest.TestCase):
+    """Copy-on-write unions and copies: writes to either side are never seen by the other"""
+    def setUp(self) -> None:
+        self.rng = random.Random(10)
+
+
+    def test_union_has_the_edges_of_both(self) -> None:
+        first, second = MultiGraph(), MultiGraph()
+        a, b = first.add_nodes_from("ab")
+        c, = second.add_nodes_from("c")
+        first.add_edge(a, b)
+        second.add_edge(c, c)
+        union = first.union(second, edges=[(b, c)])
+        self.assertEqual(edges(union), [("a", "b", "[1]"), ("b", "c", "[1]"), ("c", "c", "[1]")])
+        self.assertEqual(edges(first + second), [("a", "b", "[1]"), ("c", "c", "[1]")])
+
+
+    def test_shared_nodes_merge_their_edges(self) -> None:
+        first = MultiGraph()
+        a, b = first.add_nodes_from("ab")
+        first.add_edge(a, b)
+        second = first.copy()
+        second.add_edge(a, b)
+        union = first.union(second)
+        self.assertEqual(edges(union), [("a", "b", "[1, 1, 1]")])
+        self.assertEqual((edges(first), edges(second)), ([("a", "b", "[1]")], [("a", "b", "[1, 1]")]))
+
+
+    def test_random_writes_stay_on_their_side(self) -> None:
+        for cls in (Graph, MultiGraph, UndirectedGraph):
+            for _ in range(20):
+                sources = []
+                for _ in range(3):
+                    graph, nodes, pairs = random_graph(self.rng, 6, 10, cls)
+                    graph.add_edges_from(pairs)
+                    sources.append(graph)
+                before = [edges(graph) for graph in sources]
+
+                union = sources[0].union(*sources[1:])
+                nodes = list(union.nodes)
+                for _ in range(10):
+                    u, v = self.rng.choice(nodes), self.rng.choice(nodes)
+                    if self.rng.random() < 0.3 and union.graph[u]:
+                        v = next(iter(union.graph[u]))
+                        union.remove_edge(u, v)
+                    else:
+                        union.add_edge(u, v)
+                if self.rng.random() < 0.5:
+                    union.remove_node(self.rng.choice(nodes))
+                self.assertEqual([edges(graph) for graph in sources], before)
+
+                union_after = edges(union)
+                for graph in sources:
+                    graph_nodes = list(graph.nodes)
+                    for _ in range(5):
+                        graph.add_edge(self.rng.choice(graph_nodes), self.rng.choice(graph_nodes))
+                    graph.remove_node(self.rng.choice(graph_nodes))
+                self.assertEqual(edges(union), union_after)
+
+
+    def test_weights_of_copies_are_independent(self) -> None:
+        graph = WeightedGraph()
+        a, b = graph.add_nodes_from("ab")
+        graph.add_edge(a, b, 3)
+        copy = graph.copy()
+        copy.remove_edge(a, b, 3)
+        copy.add_edge(a, b, 5)
+        self.assertEqual((edges(graph), edges(copy)), ([("a", "b", "3")], [("a", "b", "5")]))
+
+
+    def test_value_index_of_union(self) -> None:
+        first, second = Graph(index_values=True), Graph()
+        a, = first.add_nodes_from("a")
+        second.add_nodes_from("ab")
+        union = first.union(second)
+        self.assertEqual(len(union.find_nodes("a")), 2)
+        self.assertEqual(union.find_node("b").value, "b")
+        self.assertEqual(first.find_nodes("a"), (a,))
+
+
+class FrozenFileTest(unittest.TestCase):
+    def setUp(self) -> None:
+        handle, self.path = tempfile.mkstemp(suffix=".graph")
+        os.close(handle)
+
+
+    def tearDown(self) -> None:
+        os.remove(self.path)
+
+
+    def test_save_and_load(self) -> None:
+        graph = WeightedGraph()
+        a, b, c = graph.add_nodes_from([(0, "a"), None, ((1.5, True), -2)])
+        graph.add_edge(a, b, 3)
+        graph.add_edge(b, c, 4)
+        graph.freeze().save(self.path)
+
+        with FrozenGraph.load(self.path) as frozen:
+            self.assertEqual([node.value for node in frozen], [(0, "a"), None, ((1.5, True), -2)])
+            first, second, third = frozen
+            self.assertEqual((frozen.get_out_edges(first), frozen.get_out_edges(second)), ({second: [3]}, {third: [4]}))
+        with self.assertRaises(ValueError):
+            frozen.out_degree(first)
+        frozen.close()
+
+
+    def test_unsupported_values_are_not_saved(self) -> None:
+        for value in ([1], {"a": 1}, (1, {2}), b"a"):
+            graph = Graph()
+            graph.add_nodes_from([value])
+            with self.assertRaises(TypeError):
+                graph.freeze().save(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+from __future__ import annotations
+import asyncio
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "game"))
+
+from game import ChaoticBot, TurnBasedGame
+from mcts import MCTSBot
+
+
+class Sprint(TurnBasedGame):
+    """Everyone decides at once to walk one step or sprint three, which only the sole sprinter gets,
+    then the player on turn rolls a step of 1-2"""
+    class Player(TurnBasedGame.Player):
+        def __init__(self, name: str, game: Sprint) -> None:
+            super().__init__(name, game)
+            self.position = 0
+            phase = lambda wanted: lambda player: player.game.current_phase == wanted
+            self.add_choice("Walk", phase(TurnBasedGame.TurnPhase.DRAW), Sprint.Player.run_alone)
+            self.add_choice("Sprint", phase(TurnBasedGame.TurnPhase.DRAW), Sprint.Player.run_alone)
+            self.add_choice("Step", phase(TurnBasedGame.TurnPhase.PLAY), lambda player: player.move(player.game.rng.randint(1, 2)))
+
+
+        def run_alone(self) -> None:
+            raise AssertionError("simultaneous choices are only resolved together")
+
+
+        def move(self, steps: int) -> None:
+            self.game.undo_stack.setattr(self, "position", self.position + steps)
+
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.simultaneous_phases = {TurnBasedGame.TurnPhase.DRAW}
+        self.resolved: list[tuple[bool, int]] = []  # (simulating, number of choices) of every resolution
+
+
+    async def resolve_simultaneous(self, decisions: dict[Sprint.Player, str]) -> None:
+        self.resolved.append((self.simulating, len(decisions)))
+        sprinters = [player for player, action in decisions.items() if action == "Sprint"]
+        for player, action in decisions.items():
+            player.move(1 if action == "Walk" else 3 if len(sprinters) == 1 else 0)
+
+
+    @property
+    def is_game_over(self) -> bool:
+        leaders = [player for player in self.players if player.position >= 30]
+        if leaders:
+            self.winners = leaders
+            self.losers = [player for player in self.players if player not in leaders]
+        return bool(leaders)
+
+
+    def setup(self) -> None:
+        super().setup()
+
+
+    def loop(self) -> None:
+        super().loop()
+
+
+class SprintBot(ChaoticBot, Sprint.Player): pass
+class SprintSearchBot(MCTSBot, Sprint.Player): pass
+
+
+class SimultaneousPhaseTest(unittest.TestCase):
+    def new_game(self) -> Sprint:
+        random.seed(21)
+        game = Sprint()
+        game.add_player(SprintSearchBot("Search", game, time_budget=10, iterations=30))
+        for seat in range(2):
+            game.add_player(SprintBot(f"Seat {seat}", game))
+        game.setup()
+        return game
+
+
+    def test_rollouts_resolve_every_players_choice(self) -> None:
+        game = self.new_game()
+        asyncio.run(game.run())
+        simulated = [count for simulating, count in game.resolved if simulating]
+        self.assertTrue(simulated)
+        self.assertEqual(set(simulated), {3})
+        self.assertTrue(game.is_game_over)
+
+
+    def test_search_restores_the_game(self) -> None:
+        game = self.new_game()
+        game.current_phase = TurnBasedGame.TurnPhase.DRAW
+        bot = game.players[0]
+        before = ([player.position for player in game.players], game.turn_count, game.rng.getstate())
+        root = asyncio.run(bot.search(["Walk", "Sprint"]))
+        self.assertEqual(root.visits, 30)
+        self.assertEqual(([player.position for player in game.players], game.turn_count, game.rng.getstate()), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
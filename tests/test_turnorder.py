@@ -0,0 +1,118 @@
+from __future__ import annotations
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "game"))
+
+from turnorder import TurnOrder
+
+
+def turns(order: TurnOrder, count: int) -> str:
+    return "".join(order.advance() for _ in range(count))
+
+
+class RingTest(unittest.TestCase):
+    def test_next_and_previous(self) -> None:
+        order = TurnOrder("ABCD")
+        self.assertEqual((order.next(), order.previous()), ("B", "D"))
+        self.assertEqual((order.left_of("D"), order.right_of("A")), ("A", "D"))
+        self.assertEqual(list(order), list("ABCD"))
+
+
+    def test_remove_during_own_turn(self) -> None:
+        order = TurnOrder("ABCD")
+        order.advance()
+        order.remove("B")
+        self.assertEqual(order.current_player, "B")
+        self.assertEqual((order.next(), order.previous()), ("C", "A"))
+        self.assertEqual(list(order), list("CDA"))
+        self.assertEqual(turns(order, 4), "CDAC")
+        self.assertNotIn("B", order)
+
+
+    def test_remove_neighbours(self) -> None:
+        order = TurnOrder("ABCDE")
+        order.remove("C")
+        order.remove("B")
+        self.assertEqual((order.next(), order.left_of("A"), order.right_of("D")), ("D", "D", "A"))
+        self.assertEqual(len(order), 3)
+
+
+    def test_restore_in_reverse_order(self) -> None:
+        order = TurnOrder("ABCDE")
+        for player in "BCE":
+            order.remove(player)
+        for player in "ECB":
+            order.restore(player)
+        self.assertEqual(list(order), list("ABCDE"))
+        self.assertEqual([order.left_of(player) for player in "ABCDE"], list("BCDEA"))
+        self.assertEqual([order.right_of(player) for player in "ABCDE"], list("EABCD"))
+
+
+    def test_remove_errors(self) -> None:
+        order = TurnOrder("AB")
+        order.remove("A")
+        with self.assertRaises(ValueError):
+            order.remove("A")
+        with self.assertRaises(ValueError):
+            order.remove("B")
+        with self.assertRaises(ValueError):
+            order.restore("B")
+
+
+    def test_reverse(self) -> None:
+        order = TurnOrder("ABCD")
+        order.advance()
+        order.reverse()
+        self.assertEqual(turns(order, 4), "ADCB")
+
+
+class RoundTest(unittest.TestCase):
+    def test_rounds(self) -> None:
+        order = TurnOrder("ABC")
+        turns(order, 7)
+        self.assertEqual((order.turns, order.rounds), (7, 2))
+
+
+    def test_round_start_eliminated_during_own_turn(self) -> None:
+        order = TurnOrder("ABC")
+        order.remove("A")
+        self.assertEqual([(order.advance(), order.rounds) for _ in range(4)], [("B", 0), ("C", 0), ("B", 1), ("C", 1)])
+
+
+    def test_round_start_eliminated_out_of_turn(self) -> None:
+        order = TurnOrder("ABCD")
+        order.advance()
+        order.remove("A")
+        self.assertEqual([(order.advance(), order.rounds) for _ in range(3)], [("C", 0), ("D", 0), ("B", 1)])
+
+
+    def test_other_seat_eliminated(self) -> None:
+        order = TurnOrder("ABCD")
+        order.advance()
+        order.remove("C")
+        self.assertEqual([(order.advance(), order.rounds) for _ in range(3)], [("D", 0), ("A", 1), ("B", 1)])
+
+
+    def test_reversal_starts_a_new_round(self) -> None:
+        order = TurnOrder("ABCD")
+        order.advance()
+        order.reverse()
+        self.assertEqual([(order.advance(), order.rounds) for _ in range(4)], [("A", 0), ("D", 0), ("C", 0), ("B", 1)])
+
+
+    def test_position_restores_counters(self) -> None:
+        order = TurnOrder("ABC")
+        order.advance()
+        position = order.position
+        order.reverse()
+        turns(order, 5)
+        order.position = position
+        self.assertEqual((order.current_player, order.turns, order.rounds, order.clockwise), ("B", 1, 0, True))
+        self.assertEqual(turns(order, 3), "CAB")
+        self.assertEqual(order.rounds, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+from __future__ import annotations
+import asyncio
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "game"))
+
+from undo import UndoStack
+from test_actionlog import DiceRace, DiceRaceBot
+
+
+class Box:
+    def __init__(self) -> None:
+        self.value = 0
+        self.items = []
+
+
+    def append(self, stack: UndoStack, item) -> None:
+        self.items.append(item)
+        stack.record(self.items.pop)
+
+
+class UndoStackTest(unittest.TestCase):
+    def test_nothing_is_recorded_by_default(self) -> None:
+        stack, box = UndoStack(), Box()
+        stack.begin_action()
+        stack.setattr(box, "value", 1)
+        box.append(stack, "a")
+        self.assertFalse(stack.recording)
+        self.assertEqual((len(stack), box.value, box.items), (0, 1, ["a"]))
+        with self.assertRaises(IndexError):
+            stack.undo()
+
+
+    def test_undo_reverts_whole_actions(self) -> None:
+        stack, box = UndoStack(enabled=True), Box()
+        for value in (1, 2):
+            stack.begin_action()
+            stack.setattr(box, "value", value)
+            box.append(stack, value)
+        self.assertEqual(len(stack), 2)
+
+        stack.undo()
+        self.assertEqual((box.value, box.items), (1, [1]))
+        stack.undo()
+        self.assertEqual((box.value, box.items), (0, []))
+
+
+    def test_rollback_and_release(self) -> None:
+        stack, box = UndoStack(), Box()
+        outer = stack.checkpoint()
+        stack.setattr(box, "value", 1)
+        inner = stack.checkpoint()
+        stack.setattr(box, "value", 2)
+        box.append(stack, "a")
+
+        stack.rollback(inner)
+        self.assertEqual((box.value, box.items), (1, []))
+        self.assertTrue(stack.recording)
+
+        inner = stack.checkpoint()
+        stack.setattr(box, "value", 3)
+        stack.release(inner)
+        stack.rollback(outer)
+        self.assertEqual(box.value, 0)
+        self.assertFalse(stack.recording)
+        self.assertEqual(stack._changes, [])
+
+
+    def test_reverting_does_not_record(self) -> None:
+        stack, box = UndoStack(), Box()
+
+        def restore(old: int = box.value) -> None:
+            stack.setattr(box, "value", old)  # goes through the recording path
+
+        mark = stack.checkpoint()
+        box.value = 5
+        stack.record(restore)
+        stack.rollback(mark)
+        self.assertEqual((box.value, stack._changes), (0, []))
+
+
+class GameRollbackTest(unittest.TestCase):
+    """Playing on from a checkpoint and rolling back restores the game exactly, including the legality cache"""
+    def snapshot(self, game: DiceRace) -> tuple:
+        return ([(player.name, player.position, player.is_playing, tuple(player.legal_actions())) for player in game.players],
+                game.turn_count, game.current_player.name, game.current_phase, game.turn_order.position)
+
+
+    async def play(self, game: DiceRace, turns: int) -> None:
+        for _ in range(turns):
+            if game.is_game_over: return
+            await game.turn()
+            game.loop()
+
+
+    def test_nested_rollbacks_of_random_games(self) -> None:
+        random.seed(20)
+        for _ in range(20):
+            game = DiceRace()
+            for seat in range(3):
+                game.add_player(DiceRaceBot(f"Seat {seat}", game))
+            game.setup()
+            asyncio.run(self.play(game, random.randrange(5)))
+            if game.is_game_over: continue
+
+            start = self.snapshot(game)
+            outer = game.checkpoint()
+            asyncio.run(self.play(game, random.randrange(1, 10)))
+            middle = self.snapshot(game)
+            inner = game.checkpoint()
+            asyncio.run(self.play(game, random.randrange(1, 10)))
+            game.rollback(inner)
+            self.assertEqual(self.snapshot(game), middle)
+            game.rollback(outer)
+            self.assertEqual(self.snapshot(game), start)
+            self.assertFalse(game.undo_stack.recording)
+
+
+if __name__ == "__main__":
+    unittest.main()